@@ -0,0 +1,56 @@
+"""Benchmark of the AsPyCC design algorithms on recorded simulator traces.
+    With record = True, the reference flue gas cases are designed once with Aspen Plus and every
+    call to the simulation document is recorded to trace_dir. Otherwise, the cases are designed on
+    the replayed traces (no Aspen Plus needed, e.g. on Linux), and the simulator calls, wall time
+    and final design of each case are compared with the baseline results, if any.
+"""
+
+# Importing required libraries
+import json
+import os
+
+from aspycc_lib.backends import AspenBackend
+from aspycc_lib.benchmark import (benchmark_summary, compare_benchmarks, load_benchmark, record_benchmark, reference_cases,
+                                  run_benchmark, save_benchmark)
+
+# Initializing Aspen Plus simulation file (only used to record the traces)
+Aspen_file_path = r'' # A .bkp file is recommended
+
+# Directory of the recorded traces, and whether to record them (Aspen Plus) or replay them
+trace_dir = r'benchmark_traces'
+record = False
+
+# Benchmark results to compare with (written by a previous run, e.g. before changing the algorithms), and where to save these ones
+baseline_path = r'benchmark_baseline.json'
+results_path = r'benchmark_results.json'
+
+# Reference cases: built-in reference industries at 150, 300 and 450 t/h (or a flue gas database, see benchmark.reference_cases)
+cases = reference_cases()
+lean_loading = 0.12 # mol NH3/mol CO2 [0.1-0.2]
+
+# Template flowsheet (see AsPyCC.py), None builds the flowsheet for every case. Use the same setting to record and replay
+template_path = None
+
+# Artificial solve time of the replayed runs: fixed [s], plus a factor of the recorded solve time
+latency = 0.0
+latency_scale = 0.0
+
+if __name__ == '__main__':
+    if record:
+        rows = record_benchmark(AspenBackend(os.path.abspath(Aspen_file_path)), trace_dir, cases, lean_loading=lean_loading,
+                                template_path=template_path)
+    else:
+        rows = run_benchmark(trace_dir, cases, lean_loading=lean_loading, template_path=template_path, latency=latency,
+                             latency_scale=latency_scale)
+    for row in rows:
+        print(f"{row['case']}: {row['status']}, {row.get('simulator_runs')} simulator runs, {row['wall_time']:.2f} s")
+    print(json.dumps(benchmark_summary(rows), indent=2))
+    save_benchmark(rows, results_path)
+
+    # Performance regressions against the baseline
+    if not record and os.path.isfile(baseline_path):
+        regressions = compare_benchmarks(load_benchmark(baseline_path), rows)
+        for regression in regressions:
+            print(f"Regression in {regression['case']}: {regression['reason']}")
+        if not regressions:
+            print('No regressions against the baseline')
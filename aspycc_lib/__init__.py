@@ -0,0 +1,48 @@
+"""AsPyCC library: reusable building blocks behind the AsPyCC.py design script.
+    The modules in this package hold the search routines and simulator helpers used
+    by the framework, so that they can be imported, reused and run against the
+    pure-Python stand-in for the Aspen Plus tree (see fake.py) on any platform.
+    The names below are imported from their module on first use, so that importing the
+    package (e.g. in every campaign worker) does not load the optional dependencies of
+    the modules that are not used, such as SciPy for sampling.
+"""
+
+import importlib
+
+# Public names of every module
+_EXPORTS = {
+    'engine': ['RunTimeoutError', 'run_and_wait'],
+    'cache': ['ResultCache', 'open_cache'],
+    'profiling': ['Profiler', 'profile_summary', 'write_prometheus'],
+    'nodes': ['NodeRegistry', 'VARIABLES'],
+    'search': ['SearchResult', 'solve_target', 'solve_target_parallel'],
+    'solvers': ['DesignSpec', 'SolverResult', 'solve_design_spec', 'solve_feasibility_2d'],
+    'absorber': ['compute_ccr', 'evaluate_ccr', 'search_packing_height', 'search_solvent_flowrate'],
+    'fake': ['FakeAspen'],
+    'backends': ['AspenBackend', 'FakeBackend'],
+    'replay': ['RecordingBackend', 'ReplayBackend', 'Trace'],
+    'surrogate': ['GaussianProcess', 'Surrogate'],
+    'pipeline': ['DesignSpecs', 'InfeasibleCaseError', 'build_template', 'design_case', 'design_status', 'open_surrogate',
+                 'read_case'],
+    'sampling': ['iter_samples', 'write_samples'],
+    'scheduler': ['nearest_neighbour_order', 'warm_start_summary'],
+    'parallel': ['DocumentPool'],
+    'journal': ['Journal', 'read_designs', 'read_journal'],
+    'campaign': ['cases_from_dataframe', 'prepare_template', 'run_campaign'],
+    'benchmark': ['compare_benchmarks', 'record_benchmark', 'reference_cases', 'run_benchmark'],
+}
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = list(_MODULES)
+
+
+def __getattr__(name):
+    if name not in _MODULES:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'{__name__}.{_MODULES[name]}'), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,55 @@
+"""Absorber design helpers: CCR evaluation and the CCR-target searches over solvent
+    flowrate and packing height used by AsPyCC.py.
+"""
+
+from aspycc_lib.search import solve_target
+
+# CCR window used to stop the absorber searches
+CCR_TARGET_WINDOW = (89.00, 90.99)
+
+
+def compute_ccr(nodes):
+    """CO2 capture rate [%] from the current CLEANGAS and FLUEGAS results."""
+    clean_gas_CO2_out = nodes.read('clean_gas_CO2_out')
+    flue_gas_CO2_in = nodes.read('flue_gas_CO2_in')
+    return ((flue_gas_CO2_in - clean_gas_CO2_out) / flue_gas_CO2_in) * 100
+
+
+def ccr_from_outputs(outputs):
+    """CO2 capture rate [%] from the outputs of an absorber evaluation (see NodeRegistry.evaluate)."""
+    clean_gas_CO2_out = outputs['clean_gas_CO2_out']
+    flue_gas_CO2_in = outputs['flue_gas_CO2_in']
+    return ((flue_gas_CO2_in - clean_gas_CO2_out) / flue_gas_CO2_in) * 100
+
+
+def absorber_ccr(nodes):
+    """Evaluate the absorber at the current inputs and return the CCR.
+
+    Returns None when the run does not converge (PER_ERROR != 0) or hangs, so the searches
+    can treat the point as a hole.
+    """
+    outputs = nodes.evaluate('absorber')
+    if outputs is None or outputs['per_error'] != 0:
+        return None
+    return ccr_from_outputs(outputs)
+
+
+def evaluate_ccr(nodes, name, value):
+    """Write `value` to the input variable `name`, evaluate the absorber and return the CCR (None on failure)."""
+    nodes.write(name, value)
+    return absorber_ccr(nodes)
+
+
+def search_solvent_flowrate(nodes, minimum_solvent_flowrate, maximum_solvent_flowrate, window=CCR_TARGET_WINDOW, max_calls=40, guess=None):
+    """Search the solvent flowrate [t/h] that brings the CCR into `window`.
+
+    The minimum flowrate (or the `guess`, if given) is evaluated first; CCR increases with solvent flowrate.
+    """
+    return solve_target(lambda flowrate: evaluate_ccr(nodes, 'solvent_flowrate', float(flowrate)),
+                        minimum_solvent_flowrate, maximum_solvent_flowrate, window, max_calls=max_calls, guess=guess)
+
+
+def search_packing_height(nodes, maximum_height=100, minimum_height=5, window=CCR_TARGET_WINDOW, max_calls=40, guess=None):
+    """Search the packing height [m] that brings the CCR into `window`, starting from the tallest column (or the `guess`)."""
+    return solve_target(lambda height: evaluate_ccr(nodes, 'packing_height', float(height)),
+                        maximum_height, minimum_height, window, max_calls=max_calls, guess=guess)
@@ -0,0 +1,104 @@
+"""Simulator backends: how a worker opens and resets its own simulation document.
+    Backends are small picklable objects so that they can be handed to worker processes.
+    With `template_path` set, documents are reset to the prebuilt full flowsheet (see
+    pipeline.build_template) instead of the base file.
+"""
+
+import hashlib
+import multiprocessing
+import os
+
+from dataclasses import dataclass, field
+
+from aspycc_lib.cache import file_fingerprint
+from aspycc_lib.engine import run_and_wait
+
+# Processes of the Aspen Plus COM server and engine (lower case)
+ASPEN_PROCESS_NAMES = ('aspenplus.exe', 'apmain.exe')
+
+
+def worker_context():
+    """Multiprocessing context of the processes that open documents of a backend. Workers are
+    spawned, as COM documents cannot be shared with forked processes."""
+    return multiprocessing.get_context('spawn')
+
+
+@dataclass
+class AspenBackend:
+    """Aspen Plus through COM, initialized from the base .bkp file (or the template built from it)."""
+    archive_path: str
+    visible: bool = False
+    template_path: str = None
+
+    def open(self):
+        import win32com.client as win32
+        Aspen = win32.Dispatch('Apwn.document')
+        self.reset(Aspen)
+        Aspen.Visible = self.visible
+        Aspen.SuppressDialogs = 1
+        return Aspen
+
+    def reset(self, Aspen):
+        # Reload the base flowsheet so that every case starts from the absorber-only topology.
+        # The template is saved converged, it is not solved again here
+        if self.template_path is not None:
+            Aspen.InitFromArchive2(os.path.abspath(self.template_path))
+            return
+        Aspen.InitFromArchive2(os.path.abspath(self.archive_path))
+        run_and_wait(Aspen)
+
+    def close(self, Aspen):
+        Aspen.Close()
+
+    def server_processes(self):
+        """Ids of the running Aspen Plus processes. The COM server of a document runs outside the
+        worker process, so that a hung worker is stopped together with the ones it started."""
+        try:
+            import psutil
+        except ImportError:
+            return set()
+        return {process.pid for process in psutil.process_iter(['name'])
+                if (process.info['name'] or '').lower() in ASPEN_PROCESS_NAMES}
+
+    def kill_servers(self, pids):
+        import psutil
+        for pid in pids:
+            try:
+                psutil.Process(pid).kill()
+            except psutil.NoSuchProcess:
+                pass
+
+    def fingerprint(self):
+        """Identifies the base simulation file for the result cache."""
+        return file_fingerprint(self.archive_path)
+
+
+@dataclass
+class FakeBackend:
+    """Pure-Python stand-in (see fake.py); `options` are passed to FakeAspen, e.g. latency in seconds."""
+    archive_path: str = 'fake.bkp'
+    options: dict = field(default_factory=dict)
+    template_path: str = None
+
+    def open(self):
+        from aspycc_lib.fake import FakeAspen
+        Aspen = FakeAspen(**self.options)
+        self.reset(Aspen)
+        return Aspen
+
+    def reset(self, Aspen):
+        Aspen.InitFromArchive2(self.archive_path if self.template_path is None else os.path.abspath(self.template_path))
+
+    def close(self, Aspen):
+        Aspen.Close()
+
+    def server_processes(self):
+        # Documents run in the worker process
+        return set()
+
+    def kill_servers(self, pids):
+        pass
+
+    def fingerprint(self):
+        # The response model is defined by the options
+        return hashlib.sha256(repr(sorted(self.options.items())).encode()).hexdigest()
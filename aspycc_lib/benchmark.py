@@ -0,0 +1,131 @@
+"""Benchmark of the design algorithms on recorded simulator traces (see replay.py).
+    record_benchmark designs a set of reference flue gas cases on a recording backend (Aspen
+    Plus, once, where it is available); run_benchmark designs the same cases on the replayed
+    traces, on any platform, and reports simulator calls, wall time and final design of each
+    case. compare_benchmarks flags the cases whose number of simulator calls grew or whose
+    design moved, so that regressions of the search algorithms are caught without Aspen Plus.
+"""
+
+import json
+import time
+
+import numpy as np
+
+from aspycc_lib.campaign import prepare_template
+from aspycc_lib.pipeline import DesignSpecs, design_case, design_status
+from aspycc_lib.replay import RecordingBackend, ReplayBackend
+
+# Flue gas compositions [wt.%] of the reference industries: midpoints of the ranges in Flue_gas_db.xlsx, H2O by balance
+REFERENCE_INDUSTRIES = {
+    'Cement': {'N2': 62.5, 'O2': 6.0, 'CO2': 19.5, 'H2O': 12.0, 'H2': 0.0, 'CO': 0.0, 'CH4': 0.0},
+}
+
+# Flue gas flowrates [t/h] designed for every reference industry
+REFERENCE_FLOWRATES = (150, 300, 450)
+
+# Final design reported and compared for every case
+DESIGN_FIELDS = ('height', 'diameter', 'flooding', 'solvent_flowrate', 'ccr', 'boilup_ratio', 'make_up_flowrate')
+
+
+def reference_cases(industries=None, flowrates=REFERENCE_FLOWRATES):
+    """{name: case} (see pipeline.read_case) for every industry at every flowrate. `industries` is
+    {industry: {species: wt.%}} (REFERENCE_INDUSTRIES by default) or a flue gas database DataFrame,
+    whose range midpoints are used."""
+    if industries is None:
+        industries = REFERENCE_INDUSTRIES
+    elif not isinstance(industries, dict):
+        from aspycc_lib.sampling import SAMPLED_SPECIES, sampling_problems
+        industries = {industry: dict(zip(SAMPLED_SPECIES, 0.5 * (lower + upper)))
+                      for industry, lower, upper in sampling_problems(industries)}
+    cases = {}
+    for industry, composition in industries.items():
+        composition = dict(composition)
+        if composition.get('H2O'):
+            composition['H2O'] = 100 - sum(value for species, value in composition.items() if species != 'H2O')
+        else:
+            composition = {species: 100 * value / sum(composition.values()) for species, value in composition.items()}
+        for flowrate in flowrates:
+            cases[f'{industry} {flowrate:g} t/h'] = dict({species: value / 100 for species, value in composition.items()},
+                                                          flowrate=float(flowrate))
+    return cases
+
+
+def _design_cases(backend, cases, lean_loading, template_path, **options):
+    # Design every case on a fresh document of `backend`, returning one benchmark row per case.
+    # The design specifications start from their initial guesses, as in a new run
+    specs = DesignSpecs()
+    if template_path is not None:
+        backend = prepare_template(backend, template_path, lean_loading=lean_loading, case=next(iter(cases.values())))
+    rows = []
+    Aspen = backend.open()
+    try:
+        for name, case in cases.items():
+            backend.reset(Aspen)
+            start = time.perf_counter()
+            try:
+                design = design_case(Aspen, case, lean_loading=lean_loading, verbose=False, template=template_path is not None,
+                                     specs=specs, **options)
+            except Exception as error:
+                rows.append({'case': name, 'status': 'failed', 'error': repr(error), 'wall_time': time.perf_counter() - start})
+                continue
+            rows.append({'case': name, 'status': design_status(design), 'wall_time': time.perf_counter() - start,
+                         'simulator_runs': design['simulator_runs'],
+                         'design': {field: float(design[field]) for field in DESIGN_FIELDS}})
+    finally:
+        backend.close(Aspen)
+    return rows
+
+
+def record_benchmark(backend, trace_dir, cases=None, lean_loading=0.12, template_path=None, **options):
+    """Design `cases` (reference_cases() by default) on `backend`, recording the traces to `trace_dir`."""
+    return _design_cases(RecordingBackend(backend, trace_dir), cases or reference_cases(), lean_loading, template_path, **options)
+
+
+def run_benchmark(trace_dir, cases=None, lean_loading=0.12, template_path=None, latency=0.0, latency_scale=0.0, **options):
+    """Design `cases` on the traces recorded in `trace_dir` and return one row per case: 'case', 'status',
+    'simulator_runs', 'wall_time' [s] and 'design' (DESIGN_FIELDS). Replayed runs take `latency` seconds
+    plus `latency_scale` times their recorded solve time; other options are passed to design_case."""
+    backend = ReplayBackend([trace_dir], options={'latency': latency, 'latency_scale': latency_scale})
+    return _design_cases(backend, cases or reference_cases(), lean_loading, template_path, **options)
+
+
+def compare_benchmarks(baseline, current, runs_tolerance=0, design_tolerance=0.01):
+    """Regressions of `current` against `baseline` (both from run_benchmark): cases that failed, need
+    more than `runs_tolerance` extra simulator runs, or whose design moved by more than
+    `design_tolerance` (relative). Returns a list of {'case', 'reason'} dicts, empty if none."""
+    baseline = {row['case']: row for row in baseline}
+    regressions = []
+    for row in current:
+        reference = baseline.get(row['case'])
+        if reference is None or reference['status'] != 'ok':
+            continue
+        if row['status'] != 'ok':
+            regressions.append({'case': row['case'], 'reason': f"{row['status']}: {row.get('error', 'targets not met')}"})
+            continue
+        if row['simulator_runs'] > reference['simulator_runs'] + runs_tolerance:
+            regressions.append({'case': row['case'],
+                                'reason': f"simulator runs {reference['simulator_runs']} -> {row['simulator_runs']}"})
+        for field in DESIGN_FIELDS:
+            old, new = reference['design'][field], row['design'][field]
+            if not np.isclose(new, old, rtol=design_tolerance, atol=0.0):
+                regressions.append({'case': row['case'], 'reason': f'{field} {old:.4g} -> {new:.4g}'})
+    return regressions
+
+
+def benchmark_summary(rows):
+    """Totals of a benchmark: cases, failures, simulator runs and wall time [s]."""
+    ok = [row for row in rows if row['status'] == 'ok']
+    return {'cases': len(rows), 'failed': len(rows) - len(ok),
+            'simulator_runs': sum(row['simulator_runs'] for row in ok),
+            'mean_simulator_runs': float(np.mean([row['simulator_runs'] for row in ok])) if ok else None,
+            'wall_time': sum(row['wall_time'] for row in rows)}
+
+
+def save_benchmark(rows, path):
+    with open(path, 'w') as file:
+        json.dump(rows, file, indent=2)
+
+
+def load_benchmark(path):
+    with open(path) as file:
+        return json.load(file)
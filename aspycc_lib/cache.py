@@ -0,0 +1,138 @@
+"""Persistent simulation-result cache (SQLite).
+    The key is the fingerprint of the base simulation file, the flowsheet stage and the exact
+    input vector of the evaluation; the value is the output vector (CCR inputs, flooding,
+    recycle mole fractions, convergence status). Repeated campaign runs and search loops that
+    come back to a point they have already seen are served without a simulator call.
+    The cache is bounded: the least recently used entries are evicted above `max_entries`.
+    An optional relative `tolerance` also accepts near matches.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from dataclasses import dataclass
+
+
+def file_fingerprint(path):
+    """SHA-256 of the contents of a file (e.g. the base .bkp)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class CacheStatistics:
+    hits: int = 0
+    near_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+
+class ResultCache:
+    """Cache of simulation outputs for one base simulation file.
+
+    `fingerprint` identifies the base file (see file_fingerprint and the backends'
+    fingerprint()). Several processes can share the same database file.
+    """
+
+    def __init__(self, path, fingerprint, max_entries=1_000_000, tolerance=None):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self.tolerance = tolerance
+        self.statistics = CacheStatistics()
+        self._connection = sqlite3.connect(path, timeout=60)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, base TEXT, stage TEXT, x0 REAL, '
+            'inputs TEXT, outputs TEXT, last_used REAL)')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS results_lookup ON results (base, stage, x0)')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS results_lru ON results (last_used)')
+        self._connection.commit()
+
+    def key(self, stage, inputs):
+        text = json.dumps([self.fingerprint, stage, [float(value) for value in inputs]])
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def get(self, stage, inputs, tolerance=None):
+        """Outputs stored for `inputs` at `stage`, or None. With a tolerance, the closest stored
+        vector whose every component is within that relative tolerance is accepted."""
+        tolerance = self.tolerance if tolerance is None else tolerance
+        key = self.key(stage, inputs)
+        row = self._connection.execute('SELECT outputs FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None and tolerance:
+            key, row = self._nearest(stage, inputs, tolerance)
+            if row is not None:
+                self.statistics.near_hits += 1
+        elif row is not None:
+            self.statistics.hits += 1
+        if row is None:
+            self.statistics.misses += 1
+            return None
+        with self._connection:
+            self._connection.execute('UPDATE results SET last_used = ? WHERE key = ?', (time.time(), key))
+        return json.loads(row[0])
+
+    def _nearest(self, stage, inputs, tolerance):
+        # Candidates are narrowed on the first input in SQL, the rest is compared here
+        x0 = float(inputs[0])
+        spread = tolerance * abs(x0)
+        rows = self._connection.execute(
+            'SELECT key, inputs, outputs FROM results WHERE base = ? AND stage = ? AND x0 BETWEEN ? AND ?',
+            (self.fingerprint, stage, x0 - spread, x0 + spread)).fetchall()
+        best, best_distance = (None, None), None
+        for key, stored, outputs in rows:
+            stored = json.loads(stored)
+            if len(stored) != len(inputs):
+                continue
+            distances = [abs(a - b) / max(abs(a), abs(b)) if a != b else 0.0 for a, b in zip(stored, inputs)]
+            distance = max(distances, default=0.0)
+            if distance <= tolerance and (best_distance is None or distance < best_distance):
+                best, best_distance = (key, (outputs,)), distance
+        return best
+
+    def put(self, stage, inputs, outputs):
+        inputs = [float(value) for value in inputs]
+        with self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (self.key(stage, inputs), self.fingerprint, stage, inputs[0], json.dumps(inputs), json.dumps(outputs), time.time()))
+        self.statistics.stores += 1
+        if self.statistics.stores % 100 == 0:
+            self.evict()
+
+    def evict(self):
+        """Drop the least recently used entries above `max_entries` (and 10 % more, so eviction runs rarely)."""
+        count = self._connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        if count <= self.max_entries:
+            return
+        excess = count - self.max_entries + self.max_entries // 10
+        with self._connection:
+            self._connection.execute(
+                'DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used LIMIT ?)', (excess,))
+        self.statistics.evictions += excess
+
+    def rows(self, stage, after=0):
+        """(row id, inputs, outputs) of the entries of `stage` stored after row id `after`, as JSON text."""
+        return self._connection.execute(
+            'SELECT rowid, inputs, outputs FROM results WHERE base = ? AND stage = ? AND rowid > ? ORDER BY rowid',
+            (self.fingerprint, stage, after)).fetchall()
+
+    def __len__(self):
+        return self._connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def close(self):
+        self._connection.close()
+
+
+def open_cache(path, backend, **options):
+    """ResultCache for the base simulation file of a backend, or None when `path` is None."""
+    if path is None:
+        return None
+    return ResultCache(os.fspath(path), backend.fingerprint(), **options)
@@ -0,0 +1,248 @@
+"""Multi-process campaign runner: sizes every flue gas row with a pool of simulator workers.
+    Each worker process owns its own simulation document built from the same base file,
+    pulls cases from a shared queue (with warm starts, from its own slice of the cases), runs
+    the full AsPyCC pipeline and streams the result back. Workers that crash, raise, or exceed
+    the per-case timeout are restarted and their case is queued again (up to `max_attempts`);
+    a worker that is terminated takes the simulator processes of its document with it. Cases
+    are handed out in the given order.
+    With a `template_path`, the full flowsheet is built once in the parent process and every
+    worker loads it instead of building the stripper section for each case.
+    With a `journal_path`, the parent process appends every evaluation, checkpoint and result
+    streamed by the workers to a journal (see journal.py); with `resume`, the cases completed
+    in it are not run again and unfinished ones restart from their last checkpoint.
+"""
+
+import dataclasses
+import multiprocessing
+import queue
+import time
+
+from aspycc_lib.backends import worker_context
+from aspycc_lib.cache import open_cache
+from aspycc_lib.journal import CaseJournal, Journal, read_journal
+from aspycc_lib.pipeline import (DesignSpecs, InfeasibleCaseError, build_template, design_case, design_status, open_surrogate,
+                                 read_case)
+
+
+def _worker(worker_id, backend, tasks, results, open_lock, lean_loading, intermediate_solves, cache_path, warm_start, use_surrogate,
+            journal, profile):
+    with open_lock:
+        # Documents are opened one at a time, so that the simulator processes started for this one are known
+        servers = backend.server_processes()
+        Aspen = backend.open()
+        servers = backend.server_processes() - servers
+    results.put(('opened', worker_id, None, sorted(servers)))
+    try:
+        cache = open_cache(cache_path, backend)
+        surrogate = open_surrogate() if use_surrogate else None
+        template = backend.template_path is not None
+        previous = None # design of the previous case, to warm start the next one
+        specs = DesignSpecs() # design specification solutions carried from case to case
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            index, case, checkpoint = task
+            results.put(('start', worker_id, index, None))
+            case_journal = CaseJournal(lambda record: results.put(('journal', worker_id, index, record)), index) if journal else None
+            if surrogate is not None and cache is not None:
+                # Evaluations stored by every worker since the last case
+                surrogate.load(cache)
+            try:
+                if previous is None or not template:
+                    # A template document keeps the converged state of the previous case for the warm start
+                    backend.reset(Aspen)
+                design = design_case(Aspen, case, lean_loading=lean_loading, verbose=False, cache=cache, template=template,
+                                     intermediate_solves=intermediate_solves, warm_start=checkpoint or previous,
+                                     surrogate=surrogate, journal=case_journal, profile=profile, specs=specs)
+            except InfeasibleCaseError as error:
+                results.put(('skipped', worker_id, index, str(error)))
+                continue
+            except Exception as error:
+                # The document may be unusable after an error, let the supervisor start a fresh worker
+                results.put(('error', worker_id, index, repr(error)))
+                return
+            results.put(('done', worker_id, index, design))
+            if warm_start and design_status(design) == 'ok':
+                previous = design
+    finally:
+        backend.close(Aspen)
+
+
+def cases_from_dataframe(df_flue_gas):
+    """(index, case) pairs for every row of a flue gas DataFrame."""
+    return [(index, read_case(row)) for index, row in df_flue_gas.iterrows()]
+
+
+def prepare_template(backend, template_path, lean_loading=0.12, case=None, intermediate_solves=True):
+    """Build the template flowsheet from the base file of `backend` and return a backend that loads it."""
+    backend = dataclasses.replace(backend, template_path=None)
+    Aspen = backend.open()
+    try:
+        build_template(Aspen, template_path, lean_loading=lean_loading, case=case, intermediate_solves=intermediate_solves)
+    finally:
+        backend.close(Aspen)
+    return dataclasses.replace(backend, template_path=template_path)
+
+
+def run_campaign(cases, backend, workers=None, lean_loading=0.12, case_timeout=3600, max_attempts=2, cache_path=None,
+                 template_path=None, warm_start=False, surrogate=False, journal_path=None, resume=False, profile=False,
+                 intermediate_solves=True, poll_interval=0.1):
+    """Size every case with `workers` processes and yield one result dict per case, as they finish.
+
+    `cases` is an iterable of (index, case) pairs (see cases_from_dataframe), `backend` an
+    AspenBackend or FakeBackend. Each result holds 'index', 'status' (see pipeline.design_status;
+    'failed' or 'skipped' without a design), 'design' or 'error', 'worker', 'attempts' and
+    'elapsed' [s]. The design options are those of pipeline.design_case (see the README).
+    """
+    context = worker_context()
+    workers = workers or multiprocessing.cpu_count()
+    results = context.Queue()
+    cases = dict(cases)
+    state = read_journal(journal_path) if journal_path is not None and resume else None
+    checkpoints = {} if state is None else {index: state.checkpoints[index] for index in cases if index in state.checkpoints}
+    if state is not None:
+        for index in [index for index in cases if index in state.completed]:
+            del cases[index]
+            yield dict(state.completed[index], resumed=True)
+    if not cases:
+        return
+    if template_path is not None:
+        backend = prepare_template(backend, template_path, lean_loading=lean_loading, case=next(iter(cases.values()), None),
+                                   intermediate_solves=intermediate_solves)
+
+    # With warm starts every worker gets its own contiguous slice of the case order (its own queue), so that
+    # each case starts from its neighbour on the path; otherwise all workers share one queue
+    slots = min(workers, len(cases))
+    if warm_start:
+        order = list(cases)
+        bounds = [round(slot * len(order) / slots) for slot in range(slots + 1)]
+        case_slot = {index: slot for slot in range(slots) for index in order[bounds[slot]:bounds[slot + 1]]}
+        queues = [context.Queue() for _ in range(slots)]
+    else:
+        case_slot = dict.fromkeys(cases, 0)
+        queues = [context.Queue()] * slots
+    for index, case in cases.items():
+        queues[case_slot[index]].put((index, case, checkpoints.get(index)))
+    attempts = {index: 0 for index in cases}
+    processes, running = {}, {} # worker_id -> process, worker_id -> (index, start time)
+    worker_slot = {} # worker_id -> slot (queue) it pulls cases from
+    servers = {} # worker_id -> ids of the simulator processes of its document
+    open_lock = context.Lock()
+    pending = set(cases)
+    next_worker_id, startup_failures = 0, 0
+
+    def start_worker(slot):
+        nonlocal next_worker_id
+        process = context.Process(target=_worker, args=(next_worker_id, backend, queues[slot], results, open_lock, lean_loading,
+                                                        intermediate_solves, cache_path, warm_start, surrogate,
+                                                        journal is not None, profile), daemon=True)
+        process.start()
+        processes[next_worker_id] = process
+        worker_slot[next_worker_id] = slot
+        next_worker_id += 1
+
+    def stop_worker(worker_id):
+        # Terminate a worker process with the simulator processes of its document, which it cannot close
+        process = processes.pop(worker_id)
+        process.terminate()
+        process.join()
+        backend.kill_servers(servers.pop(worker_id, ()))
+        return process
+
+    def restart_worker(worker_id):
+        # Start a fresh worker on the queue of a worker that stopped, if cases are left in it
+        servers.pop(worker_id, None)
+        slot = worker_slot.pop(worker_id)
+        if any(queues[case_slot[index]] is queues[slot] for index in pending):
+            start_worker(slot)
+
+    def retry_or_fail(worker_id, index, error):
+        # Put the case back in the queue, or report it as failed once the attempts are used up
+        _, started = running.pop(worker_id)
+        elapsed = time.perf_counter() - started
+        if index in pending and attempts[index] < max_attempts:
+            queues[case_slot[index]].put((index, cases[index], checkpoints.get(index)))
+            return None
+        pending.discard(index)
+        return record({'index': index, 'status': 'failed', 'error': error, 'worker': worker_id, 'attempts': attempts[index],
+                       'elapsed': elapsed})
+
+    def record(result):
+        if journal is not None:
+            journal.result(result)
+        return result
+
+    journal = Journal(journal_path) if journal_path is not None else None
+    for slot in range(slots):
+        start_worker(slot)
+
+    try:
+        while pending:
+            try:
+                message, worker_id, index, payload = results.get(timeout=poll_interval)
+            except queue.Empty:
+                message = None
+            if message == 'journal':
+                journal.write(payload)
+                if payload['type'] == 'checkpoint':
+                    checkpoints[index] = payload['design']
+            elif message == 'opened':
+                servers[worker_id] = payload
+            elif message == 'start':
+                attempts[index] += 1
+                running[worker_id] = (index, time.perf_counter())
+                if worker_id not in processes:
+                    # The worker was stopped before its case was seen to start
+                    failed = retry_or_fail(worker_id, index, 'worker stopped')
+                    if failed is not None:
+                        yield failed
+            elif message in ('done', 'skipped', 'error') and worker_id not in running:
+                pass # late message of a worker that was stopped, its case has been queued again
+            elif message == 'done':
+                _, started = running.pop(worker_id)
+                pending.discard(index)
+                yield record({'index': index, 'status': design_status(payload), 'design': payload, 'worker': worker_id,
+                              'attempts': attempts[index], 'elapsed': time.perf_counter() - started})
+            elif message == 'skipped':
+                _, started = running.pop(worker_id)
+                pending.discard(index)
+                yield record({'index': index, 'status': 'skipped', 'error': payload, 'worker': worker_id,
+                              'attempts': attempts[index], 'elapsed': time.perf_counter() - started})
+            elif message == 'error':
+                processes.pop(worker_id).join()
+                failed = retry_or_fail(worker_id, index, payload)
+                if failed is not None:
+                    yield failed
+                restart_worker(worker_id)
+
+            # Restart workers that died or hang on a case
+            now = time.perf_counter()
+            for worker_id, process in list(processes.items()):
+                crashed = not process.is_alive()
+                hung = worker_id in running and now - running[worker_id][1] > case_timeout
+                if not (crashed or hung):
+                    continue
+                if crashed and not results.empty():
+                    # Its last messages are still in the result queue
+                    continue
+                if crashed and worker_id not in running:
+                    startup_failures += 1
+                    if startup_failures > 3 * workers:
+                        raise RuntimeError(f'Simulator workers keep exiting before running a case (exit code {process.exitcode})')
+                stop_worker(worker_id)
+                if worker_id in running:
+                    index = running[worker_id][0]
+                    failed = retry_or_fail(worker_id, index, 'timeout' if hung else f'worker exit code {process.exitcode}')
+                    if failed is not None:
+                        yield failed
+                restart_worker(worker_id)
+    finally:
+        for worker_id in processes:
+            queues[worker_slot[worker_id]].put(None)
+        for worker_id, process in list(processes.items()):
+            process.join(timeout=5)
+            if process.is_alive():
+                stop_worker(worker_id)
+        if journal is not None:
+            journal.close()
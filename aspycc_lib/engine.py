@@ -0,0 +1,96 @@
+"""Run-and-wait primitive for the simulation engine.
+    Replaces the fixed `while Aspen.Engine.IsRunning: time.sleep(0.5)` pattern with adaptive
+    polling: short sleeps first, backed off exponentially up to `max_sleep`. Every run has a
+    timeout after which it is reported as hung, and the measured solve time is recorded
+    against the time spent waiting for the next poll.
+"""
+
+import time
+
+from dataclasses import dataclass
+
+# Default polling and timeout settings
+INITIAL_SLEEP = 0.005 # s
+MAX_SLEEP = 0.5 # s
+BACKOFF = 2.0
+RUN_TIMEOUT = 600 # s
+
+
+class RunTimeoutError(RuntimeError):
+    """Raised when a simulation run does not finish within its timeout."""
+
+
+@dataclass
+class RunResult:
+    """Timing of one run. The engine finished between the last poll that saw it running and the first that did not,
+    so `solve_time` is the time until the last running poll and `wait_overhead` the time after it."""
+    hung: bool
+    elapsed: float
+    solve_time: float
+    wait_overhead: float
+    polls: int
+
+
+@dataclass
+class RunStatistics:
+    """Accumulated run timings."""
+    runs: int = 0
+    hung: int = 0
+    polls: int = 0
+    elapsed: float = 0.0
+    solve_time: float = 0.0
+    wait_overhead: float = 0.0
+
+    def add(self, result):
+        self.runs += 1
+        self.hung += int(result.hung)
+        self.polls += result.polls
+        self.elapsed += result.elapsed
+        self.solve_time += result.solve_time
+        self.wait_overhead += result.wait_overhead
+
+    def since(self, start):
+        """Statistics accumulated after the snapshot `start` (a copy taken with snapshot())."""
+        return RunStatistics(*(getattr(self, name) - getattr(start, name) for name in self.__dataclass_fields__))
+
+    def snapshot(self):
+        return RunStatistics(**self.__dict__)
+
+
+# Statistics of every run made in this process
+statistics = RunStatistics()
+
+
+def run_and_wait(Aspen, timeout=RUN_TIMEOUT, initial_sleep=INITIAL_SLEEP, max_sleep=MAX_SLEEP, backoff=BACKOFF, raise_on_hang=True):
+    """Run the simulation and wait for the engine to finish.
+
+    Returns a RunResult. If the engine is still running after `timeout` seconds it is asked to
+    stop and the run is reported as hung: RunTimeoutError is raised, unless `raise_on_hang` is
+    False, in which case the result (with `hung` set) is returned for the caller to handle.
+    """
+    start = time.perf_counter()
+    Aspen.Engine.Run2(True) # asynchronous: returns at once, so the engine can be polled and stopped
+    last_running = time.perf_counter()
+    sleep, polls, hung = initial_sleep, 0, False
+    while True:
+        polls += 1
+        running = Aspen.Engine.IsRunning
+        now = time.perf_counter()
+        if not running:
+            break
+        last_running = now
+        if timeout is not None and now - start > timeout:
+            hung = True
+            try:
+                Aspen.Engine.Stop()
+            except Exception:
+                pass
+            break
+        time.sleep(sleep)
+        sleep = min(sleep * backoff, max_sleep)
+    end = time.perf_counter()
+    result = RunResult(hung, end - start, last_running - start, end - last_running, polls)
+    statistics.add(result)
+    if hung and raise_on_hang:
+        raise RunTimeoutError(f'Simulation still running after {timeout} s')
+    return result
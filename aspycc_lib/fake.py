@@ -0,0 +1,269 @@
+"""Pure-Python stand-in for the Aspen Plus COM document ('Apwn.document').
+    Mimics the parts of the Aspen object model used by AsPyCC (Tree.FindNode, Tree.Elements,
+    Engine.Run2/IsRunning, Reinit, InitFromArchive2, SaveAs, Close) on top of simple, known
+    response curves, so that the design algorithms can be run and checked on Linux.
+
+    Runs with the solvent flowrate in one of the `holes` fail: only PER_ERROR is set and
+    the result nodes of blocks and streams are missing, as in Aspen Plus.
+
+    Response curves (G = flue gas t/h, L = solvent t/h, H = packing height m, D = diameter m):
+        CCR [%]       = 100 * (1 - exp(-k_ccr * (L / G) * (1 - exp(-H / h_ref))))
+        Flooding [%]  = k_fld * (G + 0.5 * L) / D**2
+        Lean loading  = loading_ref * exp(-k_br * BASIS_BR)
+"""
+
+import math
+import os
+import pickle
+import time
+
+from aspycc_lib.nodes import is_output_path, normalize_path
+
+# Blocks and streams present in the base .bkp file before the stripper section is built
+BASE_BLOCKS = ['ABSORBER']
+BASE_STREAMS = ['FLUEGAS', 'LEANNH3', 'CLEANGAS', 'RICHSOLV']
+
+
+class FakeNode:
+    """Handle returned by FindNode; reads and writes go straight to the document values."""
+
+    def __init__(self, document, path):
+        self._document = document
+        self._path = path
+
+    @property
+    def Value(self):
+        return self._document._values.get(self._path)
+
+    @Value.setter
+    def Value(self, value):
+        self._document._values[self._path] = value
+
+
+class FakeElements:
+    """Collection behind `.Elements`: callable by name, with Add/Remove."""
+
+    def __init__(self, element):
+        self._element = element
+
+    def __call__(self, name):
+        children = self._element.children
+        if name not in children:
+            if not self._element.auto_children:
+                raise KeyError(f'Element {name} does not exist')
+            children[name] = FakeElement(name)
+        return children[name]
+
+    def Add(self, name):
+        # Aspen uses 'NAME!Type' for blocks and streams, plain names for port connections
+        name, _, kind = name.partition('!')
+        if name in self._element.children:
+            raise ValueError(f'Element {name} already exists')
+        self._element.children[name] = FakeElement(name, kind)
+        if kind and kind != 'MATERIAL':
+            # Blocks expose their ports as a container that accepts any port name
+            ports = FakeElement('Ports', auto_children=True)
+            self._element.children[name].children['Ports'] = ports
+        return self._element.children[name]
+
+    def Remove(self, name):
+        del self._element.children[name]
+
+    @property
+    def Count(self):
+        return len(self._element.children)
+
+
+class FakeElement:
+    def __init__(self, name, kind='', auto_children=False):
+        self.Name = name
+        self.kind = kind
+        self.children = {}
+        self.auto_children = auto_children
+        self.Elements = FakeElements(self)
+
+
+class FakeEngine:
+    def __init__(self, document):
+        self._document = document
+        self._busy_until = 0.0
+        self.run_count = 0
+
+    def Run2(self, asynchronous=False):
+        # Like Aspen Plus, the call blocks until the run finishes unless it is asynchronous
+        self.run_count += 1
+        self._document._solve()
+        latency = self._document.latency
+        if self._document.hang_every and self.run_count % self._document.hang_every == 0:
+            latency = float('inf')
+        if not asynchronous and latency != float('inf'):
+            time.sleep(latency)
+            latency = 0.0
+        self._busy_until = time.perf_counter() + latency
+
+    @property
+    def IsRunning(self):
+        return time.perf_counter() < self._busy_until
+
+    def Stop(self):
+        self._busy_until = 0.0
+
+
+class FakeTree:
+    def __init__(self, document):
+        self._document = document
+
+    def FindNode(self, path):
+        path = normalize_path(path)
+        parts = path.split('\\')
+        # Like Aspen, return None for nodes of blocks or streams that do not exist,
+        # and for the results of a run that did not converge
+        if len(parts) > 2 and parts[1] in ('Blocks', 'Streams'):
+            if parts[2] not in self._document._root.children['Data'].children[parts[1]].children:
+                return None
+            if self._document._failed and 'Output' in parts and path not in self._document._values:
+                return None
+        return FakeNode(self._document, path)
+
+    def Elements(self, name):
+        return self._document._root.Elements(name)
+
+
+class FakeAspen:
+    """Stand-in for win32.Dispatch('Apwn.document').
+
+    `latency` is the artificial solve time in seconds reported through Engine.IsRunning,
+    `holes` is a list of (low, high) solvent flowrate intervals where the run does not
+    converge (PER_ERROR = 1), and `hang_every` makes every n-th run never finish.
+    """
+
+    def __init__(self, latency=0.0, holes=(), hang_every=0, k_ccr=1.0, h_ref=20.0, k_fld=2.9,
+                 loading_ref=0.4, k_br=8.0, default_diameter=5.0):
+        self.latency = latency
+        self.holes = list(holes)
+        self.hang_every = hang_every
+        self.k_ccr = k_ccr
+        self.h_ref = h_ref
+        self.k_fld = k_fld
+        self.loading_ref = loading_ref
+        self.k_br = k_br
+        self.default_diameter = default_diameter
+        self.Visible = False
+        self.SuppressDialogs = 0
+        self.Engine = FakeEngine(self)
+        self.Tree = FakeTree(self)
+        self.archive = None
+        self.saved_archives = {}
+        self._failed = False # the last run did not converge, its results are missing
+        self._reset()
+
+    def _reset(self, values=None, root=None):
+        self._root = FakeElement('Root')
+        data = self._root.Elements.Add('Data')
+        data.Elements.Add('Blocks')
+        data.Elements.Add('Streams')
+        for name in BASE_BLOCKS:
+            data.children['Blocks'].Elements.Add(name + '!RadFrac')
+        for name in BASE_STREAMS:
+            data.children['Streams'].Elements.Add(name + '!MATERIAL')
+        if root is not None:
+            self._root = root
+        self._values = {
+            r'Data\Streams\FLUEGAS\Input\TOTFLOW\MIXED': 100.0,
+            r'Data\Streams\FLUEGAS\Input\FLOW\MIXED\CO2': 0.15,
+            r'Data\Streams\LEANNH3\Input\TOTFLOW\MIXED': 100.0,
+            r'Data\Blocks\ABSORBER\Subobjects\Column Internals\INT-1\Input\CA_PACK_HT\INT-1\CS-1': 100.0,
+            r'Data\Blocks\ABSORBER\Subobjects\Column Internals\INT-1\Input\CA_DIAM\INT-1\CS-1': self.default_diameter,
+        }
+        if values is not None:
+            self._values = dict(values)
+
+    # ----- Document level methods -----
+
+    def InitFromArchive2(self, path, *args):
+        self.archive = path
+        if path not in self.saved_archives and os.path.isfile(path):
+            # Archive saved by another stand-in document (e.g. a template built by the parent process)
+            try:
+                with open(path, 'rb') as file:
+                    self.saved_archives[path] = pickle.load(file)
+            except (pickle.UnpicklingError, EOFError):
+                pass
+        if path in self.saved_archives:
+            values, root = self.saved_archives[path]
+            self._reset(values, _copy_element(root))
+        else:
+            self._reset()
+
+    def SaveAs(self, path, *args):
+        self.saved_archives[path] = (dict(self._values), _copy_element(self._root))
+        with open(path, 'wb') as file:
+            pickle.dump(self.saved_archives[path], file)
+
+    def Reinit(self):
+        # Drop results, keep inputs and topology
+        self._values = {path: value for path, value in self._values.items() if not is_output_path(path)}
+
+    def Close(self):
+        pass
+
+    # ----- Response model -----
+
+    def _value(self, path, default=0.0):
+        value = self._values.get(path)
+        return default if value is None else float(value)
+
+    def _has(self, kind, name):
+        return name in self._root.children['Data'].children[kind].children
+
+    def _solve(self):
+        set_value = self._values.__setitem__
+        flue_gas = self._value(r'Data\Streams\FLUEGAS\Input\TOTFLOW\MIXED', 100.0)
+        co2_fraction = self._value(r'Data\Streams\FLUEGAS\Input\FLOW\MIXED\CO2', 0.15)
+        solvent = self._value(r'Data\Streams\LEANNH3\Input\TOTFLOW\MIXED', 100.0)
+        height = self._value(r'Data\Blocks\ABSORBER\Subobjects\Column Internals\INT-1\Input\CA_PACK_HT\INT-1\CS-1', 100.0)
+        diameter = self._value(r'Data\Blocks\ABSORBER\Subobjects\Column Internals\INT-1\Input\CA_DIAM\INT-1\CS-1', self.default_diameter)
+
+        # Convergence status
+        error = any(low <= solvent <= high for low, high in self.holes) or flue_gas <= 0 or diameter <= 0
+        set_value(r'Data\Results Summary\Run-Status\Output\PER_ERROR', 1 if error else 0)
+
+        # Absorber
+        ccr = 1 - math.exp(-self.k_ccr * (solvent / flue_gas) * (1 - math.exp(-max(height, 0.0) / self.h_ref)))
+        flue_gas_CO2 = flue_gas * co2_fraction * 1000 # kg/h
+        set_value(r'Data\Streams\FLUEGAS\Output\MASSFLOW\MIXED\CO2', flue_gas_CO2)
+        set_value(r'Data\Streams\CLEANGAS\Output\MASSFLOW\MIXED\CO2', flue_gas_CO2 * (1 - ccr))
+        set_value(r'Data\Blocks\ABSORBER\Output\CA_FLD_FAC1\INT-1\CS-1', self.k_fld * (flue_gas + 0.5 * solvent) / diameter ** 2)
+        set_value(r'Data\Streams\CLEANGAS\Output\MOLEFLOW\MIXED\NH3', 1e-3 * solvent)
+
+        # Stripper and recycle loop
+        if self._has('Streams', 'CO2'):
+            set_value(r'Data\Streams\CO2\Output\MOLEFLOW\MIXED\NH3', 5e-4 * solvent)
+        if self._has('Streams', 'RECYCLE'):
+            boilup_ratio = self._value(r'Data\Blocks\STRIP\Input\BASIS_BR', 0.03)
+            loading = self.loading_ref * math.exp(-self.k_br * boilup_ratio)
+            apparent_NH3 = 0.05
+            apparent_CO2 = loading * apparent_NH3
+            NH2COO = 0.4 * apparent_CO2
+            fractions = {'NH3': 0.5 * (apparent_NH3 - NH2COO), 'NH4+': 0.5 * (apparent_NH3 - NH2COO), 'NH2COO-': NH2COO,
+                         'CO2': 0.05 * apparent_CO2, 'HCO3-': 0.4 * apparent_CO2, 'CO3-2': 0.15 * apparent_CO2}
+            for species, fraction in fractions.items():
+                set_value(rf'Data\Streams\RECYCLE\Output\MOLEFRAC\MIXED\{species}', fraction)
+
+        # A failed run leaves no results but its status
+        self._failed = error
+        if error:
+            self._values = {path: value for path, value in self._values.items()
+                            if not is_output_path(path) or path.startswith('Data\\Results Summary')}
+
+    def ccr(self, solvent, height, flue_gas=None):
+        """Exact CCR [%] of the response model, for checking search results."""
+        if flue_gas is None:
+            flue_gas = self._value(r'Data\Streams\FLUEGAS\Input\TOTFLOW\MIXED', 100.0)
+        return 100 * (1 - math.exp(-self.k_ccr * (solvent / flue_gas) * (1 - math.exp(-height / self.h_ref))))
+
+
+def _copy_element(element):
+    copy = FakeElement(element.Name, element.kind, element.auto_children)
+    copy.children = {name: _copy_element(child) for name, child in element.children.items()}
+    return copy
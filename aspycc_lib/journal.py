@@ -0,0 +1,127 @@
+"""Append-only campaign journal (JSON Lines) and the state read back to resume a campaign.
+    Every simulator evaluation, the checkpoints of each case (design after the absorber and
+    after the recycle-loading correction) and every per-case result (final design or error)
+    are appended as one JSON record per line and flushed at once, so a crash of Aspen Plus or
+    of the script loses at most the simulation in progress. Nothing is kept in memory.
+    read_journal streams the file back into the completed cases and the last checkpoint of
+    the unfinished ones; a case restarted from its checkpoint skips the absorber searches.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from dataclasses import dataclass, field
+
+# Result statuses of completed cases (see campaign.run_campaign); failed cases are retried on resume
+COMPLETED_STATUSES = ('ok', 'skipped')
+
+
+def _to_json(value):
+    # NumPy scalars and arrays in the designs and simulator outputs
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+class CaseJournal:
+    """Records of one case, as reported by design_case (see pipeline.py); `write` receives each record."""
+
+    def __init__(self, write, index):
+        self._write = write
+        self.index = index
+
+    def evaluation(self, stage, inputs, outputs):
+        self._write({'type': 'evaluation', 'index': self.index, 'stage': stage, 'inputs': inputs, 'outputs': outputs})
+
+    def checkpoint(self, phase, design):
+        self._write({'type': 'checkpoint', 'index': self.index, 'phase': phase, 'design': design})
+
+
+class Journal:
+    """JSON Lines journal appended to `path`. With `fsync`, every record is also forced to disk."""
+
+    def __init__(self, path, fsync=False):
+        self.path = path
+        self.fsync = fsync
+        self.records = 0
+        ends_cleanly = True
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as file:
+                file.seek(-1, os.SEEK_END)
+                ends_cleanly = file.read(1) == b'\n'
+        self._file = open(path, 'a', encoding='utf-8')
+        if not ends_cleanly:
+            self._file.write('\n') # the last record was cut by a crash, start a new line
+
+    def write(self, record):
+        self._file.write(json.dumps(record, default=_to_json) + '\n')
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.records += 1
+
+    def case(self, index):
+        return CaseJournal(self.write, index)
+
+    def result(self, result):
+        """Record a per-case result dict (see campaign.run_campaign)."""
+        self.write(dict(result, type='result'))
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+@dataclass
+class JournalState:
+    """Campaign state in a journal: result of every completed case and last checkpoint of the others."""
+    completed: dict = field(default_factory=dict) # index -> result record
+    checkpoints: dict = field(default_factory=dict) # index -> design of the last checkpoint
+    evaluations: int = 0
+    corrupted: int = 0 # unreadable lines (e.g. cut by a crash)
+
+
+def _records(path):
+    if not os.path.exists(path):
+        return
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    yield None
+
+
+def read_journal(path):
+    """Stream a journal into a JournalState (an empty one if the file does not exist)."""
+    state = JournalState()
+    for record in _records(path):
+        if record is None:
+            state.corrupted += 1
+        elif record['type'] == 'evaluation':
+            state.evaluations += 1
+        elif record['type'] == 'checkpoint':
+            state.checkpoints[record['index']] = record['design']
+        elif record['type'] == 'result':
+            if record['status'] in COMPLETED_STATUSES:
+                state.completed[record['index']] = record
+                state.checkpoints.pop(record['index'], None)
+    return state
+
+
+def read_designs(path):
+    """Final designs of the journal as a DataFrame indexed by case (the latest result of each case)."""
+    designs = {record['index']: record['design'] for record in _records(path)
+               if record is not None and record['type'] == 'result' and record['status'] == 'ok'}
+    return pd.DataFrame.from_dict(designs, orient='index')
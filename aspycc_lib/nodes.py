@@ -0,0 +1,261 @@
+"""Typed variable registry over Aspen.Tree.FindNode with a node-handle cache.
+    Every FindNode call is a cross-process COM round trip. The registry resolves each path
+    once, keeps the handle, and only drops it when the block or stream it belongs to is
+    added or removed through add_element/remove_element/connect/disconnect (or when the
+    document is reloaded). Reads and writes go through the cached handles, and read_many
+    returns a NumPy vector, e.g. of the species used for the apparent lean loading.
+    Point evaluations of a flowsheet stage (evaluate) can be served from a ResultCache
+    (see cache.py); the simulation is then re-run lazily, only if a result is read from
+    the document before the next run. Every simulator run is also passed to a Surrogate
+    and to a case journal, if given (see surrogate.py and journal.py). With a Profiler, phase()
+    measures the runs and COM traffic of a named phase (see profiling.py).
+"""
+
+import numpy as np
+
+from dataclasses import dataclass
+
+from aspycc_lib.engine import run_and_wait
+from aspycc_lib.profiling import NULL_PHASE
+
+# Species of the flue gas (in the column order of the flue gas database written by Data_generation.ipynb)
+# and lean solvent streams, and of the apparent lean loading of the recycle
+FLUE_GAS_SPECIES = ['N2', 'O2', 'CO2', 'H2O', 'H2', 'CO', 'CH4']
+LEAN_SOLVENT_SPECIES = ['NH3', 'CO2', 'H2O']
+APPARENT_LOADING_SPECIES = ['NH3', 'NH4+', 'NH2COO-', 'CO2', 'HCO3-', 'CO3-2']
+
+# Named variables used by AsPyCC: name -> (Aspen tree path, type)
+VARIABLES = {
+    'per_error': (r'\Data\Results Summary\Run-Status\Output\PER_ERROR', int),
+    'flue_gas_flowrate': (r'\Data\Streams\FLUEGAS\Input\TOTFLOW\MIXED', float),
+    'solvent_flowrate': (r'\Data\Streams\LEANNH3\Input\TOTFLOW\MIXED', float),
+    'packing_height': (r'\Data\Blocks\ABSORBER\Subobjects\Column Internals\INT-1\Input\CA_PACK_HT\INT-1\CS-1', float),
+    'diameter': (r'\Data\Blocks\ABSORBER\Subobjects\Column Internals\INT-1\Input\CA_DIAM\INT-1\CS-1', float),
+    'flooding': (r'\Data\Blocks\ABSORBER\Output\CA_FLD_FAC1\INT-1\CS-1', float),
+    'clean_gas_CO2_out': (r'\Data\Streams\CLEANGAS\Output\MASSFLOW\MIXED\CO2', float),
+    'flue_gas_CO2_in': (r'\Data\Streams\FLUEGAS\Output\MASSFLOW\MIXED\CO2', float),
+    'clean_gas_NH3': (r'\Data\Streams\CLEANGAS\Output\MOLEFLOW\MIXED\NH3', float),
+    'CO2_product_NH3': (r'\Data\Streams\CO2\Output\MOLEFLOW\MIXED\NH3', float),
+    'boilup_ratio': (r'\Data\Blocks\STRIP\Input\BASIS_BR', float),
+    'make_up_flowrate': (r'\Data\Streams\MKP\Input\TOTFLOW\MIXED', float),
+    'make_up_NH3': (r'\Data\Streams\MKP\Input\FLOW\MIXED\NH3', float),
+}
+for species in FLUE_GAS_SPECIES:
+    VARIABLES[f'flue_gas_{species}'] = (rf'\Data\Streams\FLUEGAS\Input\FLOW\MIXED\{species}', float)
+for species in LEAN_SOLVENT_SPECIES:
+    VARIABLES[f'lean_solvent_{species}'] = (rf'\Data\Streams\LEANNH3\Input\FLOW\MIXED\{species}', float)
+for species in APPARENT_LOADING_SPECIES:
+    VARIABLES[f'recycle_{species}'] = (rf'\Data\Streams\RECYCLE\Output\MOLEFRAC\MIXED\{species}', float)
+
+# Names of the recycle mole fractions, in APPARENT_LOADING_SPECIES order
+RECYCLE_LOADING_VARIABLES = [f'recycle_{species}' for species in APPARENT_LOADING_SPECIES]
+
+# Flowsheet stages evaluated point by point: stage -> (input variables, output variables)
+ABSORBER_INPUTS = (['flue_gas_flowrate'] + [f'flue_gas_{species}' for species in ['N2', 'O2', 'CO2', 'H2O']]
+                   + [f'lean_solvent_{species}' for species in LEAN_SOLVENT_SPECIES]
+                   + ['solvent_flowrate', 'diameter', 'packing_height'])
+STAGES = {
+    'absorber': (ABSORBER_INPUTS, ['per_error', 'clean_gas_CO2_out', 'flue_gas_CO2_in', 'flooding']),
+    'stripper': (ABSORBER_INPUTS + ['boilup_ratio'], ['per_error'] + RECYCLE_LOADING_VARIABLES),
+}
+
+
+@dataclass
+class NodeCounters:
+    """COM traffic through the registry. Each cache hit is one FindNode round trip saved."""
+    lookups: int = 0
+    hits: int = 0
+    reads: int = 0
+    writes: int = 0
+    element_calls: int = 0
+    invalidations: int = 0
+
+    @property
+    def round_trips_saved(self):
+        return self.hits
+
+
+class NodeRegistry:
+    """Cached access to the Aspen tree of one document.
+
+    Variables are addressed by their registry name (see VARIABLES) or directly by tree path.
+    """
+
+    def __init__(self, Aspen, variables=None, cache=None, surrogate=None, journal=None, profiler=None):
+        self.Aspen = Aspen
+        self.variables = dict(VARIABLES if variables is None else variables)
+        self.cache = cache
+        self.surrogate = surrogate
+        self.journal = journal
+        self.profiler = profiler
+        self.counters = NodeCounters()
+        self.values = {} # last value written to each named variable
+        self._handles = {}
+        self._needs_run = False # results in the document do not match the inputs (cache hit)
+
+    def define(self, name, path, kind=float):
+        self.variables[name] = (path, kind)
+
+    def path(self, name):
+        return self.variables[name][0] if name in self.variables else name
+
+    def node(self, name):
+        """Node handle for a variable name or tree path; None if the node does not exist."""
+        path = normalize_path(self.path(name))
+        handle = self._handles.get(path)
+        if handle is not None:
+            self.counters.hits += 1
+            return handle
+        self.counters.lookups += 1
+        handle = self.Aspen.Tree.FindNode('\\' + path)
+        if handle is not None:
+            self._handles[path] = handle
+        return handle
+
+    def read(self, name):
+        if is_output_path(self.path(name)):
+            self.sync()
+        value = self.node(name).Value
+        self.counters.reads += 1
+        kind = self.variables[name][1] if name in self.variables else None
+        return value if value is None or kind is None else kind(value)
+
+    def write(self, name, value):
+        self.node(name).Value = value
+        self.counters.writes += 1
+        if name in self.variables:
+            self.values[name] = value
+
+    def read_many(self, names):
+        """Values of several numeric variables as a NumPy vector."""
+        return np.array([self.read(name) for name in names], dtype=float)
+
+    def write_many(self, values):
+        """Write a {name: value} mapping."""
+        for name, value in values.items():
+            self.write(name, value)
+
+    def phase(self, name):
+        """Context manager profiling the phase `name`; a no-op without a profiler."""
+        return NULL_PHASE if self.profiler is None else self.profiler.phase(name, self.counters)
+
+    def run(self, **options):
+        """Run the simulation and wait for it (see engine.run_and_wait)."""
+        self._needs_run = False
+        return run_and_wait(self.Aspen, **options)
+
+    def inputs(self, stage):
+        """Current input vector of `stage` (see STAGES); inputs not written yet are read from the document."""
+        for name in STAGES[stage][0]:
+            if name not in self.values:
+                self.values[name] = self.read(name)
+        return [self.values[name] for name in STAGES[stage][0]]
+
+    def sync(self):
+        """Run the simulation if the results in the document are stale (after cache hits)."""
+        if self._needs_run:
+            self.run()
+
+    def evaluate(self, stage):
+        """Outputs of `stage` (see STAGES) at the current inputs, as a {name: value} dict.
+
+        Served from the cache when the same input vector has been simulated before, otherwise
+        the simulation is run (and the result stored). Returns None if the run hangs.
+        """
+        output_names = STAGES[stage][1]
+        inputs = self.inputs(stage)
+        if self.cache is not None:
+            outputs = self.cache.get(stage, inputs)
+            if outputs is not None:
+                self._needs_run = True
+                return outputs
+        if self.run(raise_on_hang=False).hung:
+            return None
+        # Results of a failed run may be missing, only the status is read and kept
+        outputs = {'per_error': self.read('per_error')}
+        if outputs['per_error'] == 0:
+            outputs.update({name: self.read(name) for name in output_names if name != 'per_error'})
+        self._store(stage, inputs, outputs)
+        return outputs
+
+    def evaluate_many(self, stage, points, pool):
+        """Outputs of `stage` at every point, a {name: value} dict holding every input of the stage,
+        evaluated at once on a DocumentPool (see parallel.py); None for points that do not finish.
+        As with evaluate, cached points are not run again and new results are stored."""
+        inputs = [[float(point[name]) for name in STAGES[stage][0]] for point in points]
+        outputs = [None if self.cache is None else self.cache.get(stage, vector) for vector in inputs]
+        missing = [position for position, result in enumerate(outputs) if result is None]
+        if missing:
+            for position, result in zip(missing, pool.evaluate_many(stage, [points[position] for position in missing])):
+                if result is not None:
+                    self._store(stage, inputs[position], result)
+                outputs[position] = result
+        return outputs
+
+    def _store(self, stage, inputs, outputs):
+        # New simulation result: cache, surrogate training data and journal
+        if self.cache is not None:
+            self.cache.put(stage, inputs, outputs)
+        if self.surrogate is not None:
+            self.surrogate.add(stage, inputs, outputs)
+        if self.journal is not None:
+            self.journal.evaluation(stage, dict(zip(STAGES[stage][0], inputs)), outputs)
+
+    # ----- Flowsheet topology -----
+
+    def _collection(self, *names):
+        element = self.Aspen.Tree
+        for name in names:
+            element = element.Elements(name)
+            self.counters.element_calls += 1
+        return element
+
+    def add_element(self, kind, name):
+        """Add a block ('NAME!Type') or stream ('NAME!MATERIAL'); `kind` is 'Blocks' or 'Streams'."""
+        self._collection('Data', kind).Elements.Add(name)
+        self.counters.element_calls += 1
+        self.invalidate(rf'Data\{kind}\{name.partition("!")[0]}')
+
+    def remove_element(self, kind, name):
+        self._collection('Data', kind).Elements.Remove(name)
+        self.counters.element_calls += 1
+        self.invalidate(rf'Data\{kind}\{name}')
+
+    def connect(self, block, port, stream):
+        """Connect `stream` to `port` of `block`."""
+        self._collection('Data', 'Blocks', block, 'Ports', port).Elements.Add(stream)
+        self.counters.element_calls += 1
+        self.invalidate(rf'Data\Blocks\{block}')
+        self.invalidate(rf'Data\Streams\{stream}')
+
+    def disconnect(self, block, port, stream):
+        self._collection('Data', 'Blocks', block, 'Ports', port).Elements.Remove(stream)
+        self.counters.element_calls += 1
+        self.invalidate(rf'Data\Blocks\{block}')
+        self.invalidate(rf'Data\Streams\{stream}')
+
+    def invalidate(self, prefix=None):
+        """Drop cached handles under the tree path `prefix`, or all of them."""
+        if prefix is None:
+            dropped = list(self._handles)
+        else:
+            prefix = normalize_path(prefix)
+            dropped = [path for path in self._handles if path == prefix or path.startswith(prefix + '\\')]
+        for path in dropped:
+            del self._handles[path]
+        self.counters.invalidations += len(dropped)
+
+    def reload(self, archive_path):
+        """Reload the document from an archive; every cached handle becomes invalid."""
+        self.Aspen.InitFromArchive2(archive_path)
+        self.invalidate()
+
+
+def normalize_path(path):
+    """Tree path without its leading and trailing backslashes."""
+    return path.strip('\\')
+
+
+def is_output_path(path):
+    """Whether a tree path is a result node of a run (an Output node), rather than an input."""
+    return '\\Output\\' in path
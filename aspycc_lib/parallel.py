@@ -0,0 +1,89 @@
+"""Pool of simulator documents for speculative evaluation within one design case.
+    Each document runs in its own process (like the campaign workers) and is opened from the
+    same backend. A batch of points, e.g. the k interior points of a k-section search, is
+    evaluated at once: every point carries the named inputs written so far on the main
+    document, so the pool documents reproduce its state before the varied input is applied.
+    Meant for latency-critical single-case designs with spare cores and licences.
+"""
+
+import queue
+
+from aspycc_lib.backends import worker_context
+from aspycc_lib.engine import RUN_TIMEOUT
+from aspycc_lib.nodes import NodeRegistry
+
+
+def _pool_worker(backend, tasks, results):
+    Aspen = backend.open()
+    nodes = NodeRegistry(Aspen)
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        batch, position, stage, values = task
+        try:
+            nodes.write_many(values)
+            outputs = nodes.evaluate(stage)
+        except Exception:
+            outputs = None
+        results.put((batch, position, outputs))
+    backend.close(Aspen)
+
+
+class DocumentPool:
+    """`size` simulator documents in worker processes, opened from `backend`.
+
+    Stages downstream of the absorber need a backend with a template (see
+    campaign.prepare_template), as the pool documents are not built by the pipeline.
+    """
+
+    def __init__(self, backend, size=4, timeout=RUN_TIMEOUT):
+        self.backend = backend
+        self.size = size
+        self.timeout = timeout
+        self.evaluations = 0
+        self._batch = 0
+        context = worker_context()
+        self._tasks, self._results = context.Queue(), context.Queue()
+        self._processes = [context.Process(target=_pool_worker, args=(backend, self._tasks, self._results), daemon=True)
+                           for _ in range(size)]
+        for process in self._processes:
+            process.start()
+
+    @property
+    def template(self):
+        return getattr(self.backend, 'template_path', None) is not None
+
+    def evaluate_many(self, stage, points):
+        """Outputs of `stage` (see NodeRegistry.evaluate) at every point, a {name: value} dict of
+        inputs; None for points that fail or do not finish within the timeout."""
+        self._batch += 1
+        for position, values in enumerate(points):
+            self._tasks.put((self._batch, position, stage, values))
+        outputs = [None] * len(points)
+        pending = len(points)
+        while pending:
+            try:
+                batch, position, result = self._results.get(timeout=self.timeout)
+            except queue.Empty:
+                break
+            if batch != self._batch:
+                continue # late result of an earlier batch
+            outputs[position] = result
+            pending -= 1
+        self.evaluations += len(points)
+        return outputs
+
+    def close(self):
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
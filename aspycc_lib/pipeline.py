@@ -0,0 +1,595 @@
+"""AsPyCC design pipeline for a single flue gas case.
+    Absorber design -> heat exchanger and stripper design -> recycle-loading correction,
+    run on an Aspen Plus document that has been initialized from the base .bkp file.
+    All tree access goes through a NodeRegistry (see nodes.py), so node handles are
+    resolved once per case.
+    With a Surrogate (see surrogate.py), the searches are narrowed to where the targets are
+    predicted and cases predicted to be infeasible are skipped; every result is still
+    verified by the simulator.
+    In template mode the downstream flowsheet (stripper, cross-heat exchanger, make-up and
+    cooler) is built and validated once and saved as a derived archive (build_template);
+    each case then loads that archive and only writes the inputs that change.
+"""
+
+import operator
+import os
+
+import numpy as np
+
+from dataclasses import dataclass, field
+
+from aspycc_lib import engine
+from aspycc_lib.absorber import (CCR_TARGET_WINDOW, absorber_ccr, ccr_from_outputs, compute_ccr, search_packing_height,
+                                 search_solvent_flowrate)
+from aspycc_lib.nodes import FLUE_GAS_SPECIES, NodeRegistry, RECYCLE_LOADING_VARIABLES, STAGES
+from aspycc_lib.profiling import Profiler
+from aspycc_lib.search import solve_target_parallel
+from aspycc_lib.solvers import DesignSpec, solve_feasibility_2d
+from aspycc_lib.surrogate import Surrogate
+
+# Species currently defined in the FLUEGAS stream of the simulation file
+SIMULATED_FLUE_GAS_SPECIES = ['N2', 'O2', 'CO2', 'H2O']
+
+# Blocks and streams added to the base flowsheet by the pipeline (present in a template)
+TEMPLATE_BLOCKS = ['HXT1', 'STRIP', 'CNDNSR', 'CHXT', 'MIXER', 'HXT2']
+TEMPLATE_STREAMS = ['TOSTRIP', 'LEANSOLV', 'VAPOR', 'CO2', 'REFLUX', 'HOTRICH', 'COLDLEAN', 'MKP', 'TOCOOLER', 'RECYCLE']
+
+
+class InfeasibleCaseError(RuntimeError):
+    """The surrogate predicts that the case cannot meet the design targets."""
+
+
+def read_case(row):
+    """Flue gas case from a row of the flue gas database (Industry, Flowrate (t/h), N2, O2, CO2, H2O, H2, CO, CH4)."""
+    case = {'flowrate': float(row.iloc[1])} # t/h
+    for position, species in enumerate(FLUE_GAS_SPECIES, start=2):
+        case[species] = float(row.iloc[position] / 100) # wt.%
+    return case
+
+
+def set_flue_gas(nodes, case):
+    """Update data for Flue gas stream in the simulation."""
+    nodes.write('flue_gas_flowrate', case['flowrate'])
+    nodes.write_many({f'flue_gas_{species}': case[species] for species in SIMULATED_FLUE_GAS_SPECIES})
+
+
+def set_lean_solvent(nodes, lean_loading):
+    """Update data for Lean solvent stream in the simulation for a given lean loading [mol CO2/mol NH3]."""
+    molecular_weight_NH3 = 17 # g/mol
+    molecular_weight_CO2 = 44 # g/mol
+    composition_lean_solvent_NH3_in = 0.05 # wt.%
+    composition_lean_solvent_CO2_in = ((composition_lean_solvent_NH3_in) / ((molecular_weight_NH3 / molecular_weight_CO2) * (1 / lean_loading))) # wt.%
+    composition_lean_solvent_H2O_in = 1 - composition_lean_solvent_NH3_in - composition_lean_solvent_CO2_in # wt.%
+    nodes.write_many({'lean_solvent_NH3': composition_lean_solvent_NH3_in,
+                      'lean_solvent_CO2': composition_lean_solvent_CO2_in,
+                      'lean_solvent_H2O': composition_lean_solvent_H2O_in})
+
+
+def input_grid(nodes, stage, name, values):
+    """Input vectors of `stage` at the current inputs, with the input `name` set to each of `values`."""
+    grid = np.tile(np.array(nodes.inputs(stage), dtype=float), (len(values), 1))
+    grid[:, STAGES[stage][0].index(name)] = values
+    return grid
+
+
+def predicted_bracket(nodes, stage, output, name, start, stop, window, points=64, confidence=2.0):
+    """Search range (start, stop, guess) of the input `name` from the surrogate: the range is narrowed
+    to where `output` can be inside `window` (with one grid step of margin), and `guess` is the point
+    predicted closest to the middle of the window. Without a trained surrogate, or if no point
+    qualifies, the range is returned unchanged with no guess."""
+    surrogate = nodes.surrogate
+    if surrogate is None or not surrogate.ready(stage):
+        return start, stop, None
+    values = np.linspace(start, stop, points)
+    mean, std = surrogate.predict(stage, input_grid(nodes, stage, name, values))[output]
+    possible = np.flatnonzero((mean + confidence * std >= window[0]) & (mean - confidence * std <= window[1]))
+    if len(possible) == 0:
+        return start, stop, None
+    guess = values[np.argmin(np.abs(mean - 0.5 * (window[0] + window[1])))]
+    return float(values[max(possible[0] - 1, 0)]), float(values[min(possible[-1] + 1, points - 1)]), float(guess)
+
+
+def predicted_solution(nodes, stage, output, name, low, high, target, points=64):
+    """Value of the input `name` in (low, high) where the surrogate predicts `output` closest to `target`, or None."""
+    surrogate = nodes.surrogate
+    if surrogate is None or not surrogate.ready(stage):
+        return None
+    values = np.linspace(low, high, points)
+    mean, _ = surrogate.predict(stage, input_grid(nodes, stage, name, values))[output]
+    return float(values[np.argmin(np.abs(mean - target))])
+
+
+def predicted_point(nodes, stage, outputs, names, x0, windows, steps, trust, bounds=None, shrink=0.5):
+    """Point of the two inputs `names` where the surrogate predicts both `outputs` inside `windows`
+    (shrunk around their middle by `shrink`, to leave room for the prediction error), found with
+    solve_feasibility_2d on the predictions; None without a trained surrogate or a solution."""
+    surrogate = nodes.surrogate
+    if surrogate is None or not surrogate.ready(stage):
+        return None
+    columns = [STAGES[stage][0].index(name) for name in names]
+    base = np.array(nodes.inputs(stage), dtype=float)
+
+    def predict(point):
+        inputs = base.copy()
+        inputs[columns] = point
+        prediction = surrogate.predict(stage, inputs[None, :])
+        return tuple(float(prediction[output][0][0]) for output in outputs)
+
+    windows = [(0.5 * (low + high) - 0.5 * shrink * (high - low), 0.5 * (low + high) + 0.5 * shrink * (high - low)) for low, high in windows]
+    prediction = solve_feasibility_2d(predict, x0, windows, steps, trust, bounds, max_calls=50)
+    return prediction.x if prediction.converged else None
+
+
+def screen_case(nodes, maximum_solvent_flowrate, maximum_height=100, minimum_probability=0.05, confidence=3.0):
+    """Raise InfeasibleCaseError if the surrogate predicts that the absorber cannot reach the CCR
+    target even with the largest solvent flowrate and column, or will not converge there."""
+    surrogate = nodes.surrogate
+    if surrogate is None or not surrogate.ready('absorber'):
+        return
+    point = input_grid(nodes, 'absorber', 'solvent_flowrate', [maximum_solvent_flowrate])
+    point[:, STAGES['absorber'][0].index('packing_height')] = maximum_height
+    prediction = surrogate.predict('absorber', point)
+    mean, std = prediction['ccr']
+    if mean[0] + confidence * std[0] < CCR_TARGET_WINDOW[0]:
+        raise InfeasibleCaseError(f'Predicted CCR at most {mean[0] + confidence * std[0]:.1f} %')
+    if prediction['convergence_probability'][0] < minimum_probability:
+        raise InfeasibleCaseError(f'Predicted convergence probability {prediction["convergence_probability"][0]:.2f}')
+
+
+def pool_search(nodes, pool, stage, name, output, start, stop, window):
+    """k-section search (see solve_target_parallel) of the input `name` on a DocumentPool, k being the
+    pool size. Points are evaluated at the current inputs of `stage` on the main document;
+    `output` is a function of the stage outputs (e.g. ccr_from_outputs)."""
+    base = dict(zip(STAGES[stage][0], nodes.inputs(stage)))
+    if stage == 'stripper':
+        base.update({variable: nodes.values[variable] for variable in ('make_up_flowrate', 'make_up_NH3') if variable in nodes.values})
+
+    def evaluate_many(points):
+        outputs = nodes.evaluate_many(stage, [dict(base, **{name: float(point)}) for point in points], pool)
+        return [None if result is None or result['per_error'] != 0 else output(result) for result in outputs]
+
+    return solve_target_parallel(evaluate_many, start, stop, window, k=max(pool.size, 2))
+
+
+def search_absorber(nodes, minimum_solvent_flowrate, maximum_solvent_flowrate, solvent_factor=1.1, verbose=True, pool=None):
+    """Cold start of the absorber: search the solvent flowrate and packing height that reach the CCR target.
+
+    With a DocumentPool (see parallel.py) both searches are k-section searches on the pool.
+    Returns the SearchResults of the solvent flowrate and packing height searches; when a search
+    is repeated over the full range, its calls include those of the first attempt.
+    """
+    with nodes.phase('solvent_search') as phase:
+        nodes.Aspen.Reinit()
+
+        # Search the solvent flowrate that reaches the CCR target (bracketed search, non-converged points are skipped),
+        # in the range predicted by the surrogate first
+        start, stop, guess = predicted_bracket(nodes, 'absorber', 'ccr', 'solvent_flowrate', minimum_solvent_flowrate, maximum_solvent_flowrate, CCR_TARGET_WINDOW)
+        if pool is not None:
+            solvent_search = pool_search(nodes, pool, 'absorber', 'solvent_flowrate', ccr_from_outputs, start, stop, CCR_TARGET_WINDOW)
+        else:
+            solvent_search = search_solvent_flowrate(nodes, start, stop, guess=guess)
+        phase.note(solvent_search.iterations, solvent_search.converged)
+        if not solvent_search.converged and guess is not None:
+            first_calls = solvent_search.calls
+            solvent_search = search_solvent_flowrate(nodes, minimum_solvent_flowrate, maximum_solvent_flowrate)
+            solvent_search.calls += first_calls
+            phase.note(solvent_search.iterations, solvent_search.converged)
+    if solvent_search.x is None:
+        raise RuntimeError('No converged simulation found in the solvent flowrate range')
+    if verbose and solvent_search.converged:
+        print(f'CCR target reached: {solvent_search.value:.2f}')
+
+    with nodes.phase('height_search') as phase:
+        # Update to effective solvent flowrate (solvent_factor is adjustable) and re-run simulation
+        effective_solvent_flowrate = solvent_search.x * solvent_factor
+        nodes.write('solvent_flowrate', round(effective_solvent_flowrate, 2))
+        nodes.run()
+
+        # Search the packing height that brings the CCR back to the target, starting from a 100 m column
+        start, stop, guess = predicted_bracket(nodes, 'absorber', 'ccr', 'packing_height', 100, 5, CCR_TARGET_WINDOW)
+        if pool is not None:
+            height_search = pool_search(nodes, pool, 'absorber', 'packing_height', ccr_from_outputs, start, stop, CCR_TARGET_WINDOW)
+        else:
+            height_search = search_packing_height(nodes, maximum_height=start, minimum_height=stop, guess=guess)
+        phase.note(height_search.iterations, height_search.converged)
+        if not height_search.converged and guess is not None:
+            first_calls = height_search.calls
+            height_search = search_packing_height(nodes, maximum_height=100, minimum_height=5)
+            height_search.calls += first_calls
+            phase.note(height_search.iterations, height_search.converged)
+        if verbose and height_search.converged:
+            print(f'CCR target reached at height {height_search.x:.2f} m')
+
+        # The search may finish on a point other than the last one simulated, so leave the column at the found height
+        nodes.write('packing_height', height_search.x)
+        nodes.run()
+    return solvent_search, height_search
+
+
+def warm_start_seed(previous, flue_gas_feed_flowrate):
+    """Starting point of the absorber from the design of a similar case: solvent flowrate scaled with
+    the flue gas flowrate, diameter with its square root (constant flooding), same packing height."""
+    ratio = flue_gas_feed_flowrate / previous['flue_gas_flowrate']
+    solvent_flowrate = min(max(previous['solvent_flowrate'] * ratio, 1 * flue_gas_feed_flowrate), 3.5 * flue_gas_feed_flowrate)
+    return {'solvent_flowrate': solvent_flowrate, 'diameter': previous['diameter'] * ratio ** 0.5,
+            'packing_height': previous['height']}
+
+
+def design_absorber(nodes, flue_gas_feed_flowrate, solvent_factor=1.1, verbose=True, seed=None, pool=None, specs=None):
+    """Size the absorber: solvent flowrate, packing height and diameter meeting the CCR and flooding targets.
+
+    With a `seed` (see warm_start_seed) the searches are skipped and the sizing starts from the
+    seed, keeping the current solver state. Returns None if that warm start does not converge.
+    A cold start always returns the design, whose 'sizing_converged' and 'final_height_converged'
+    tell whether the targets were met; 'sizing_trajectory' holds the points of the 2-D sizing.
+    The final height is solved with the DesignSpecs `specs` of the run (new ones by default).
+    """
+    specs = DesignSpecs() if specs is None else specs
+    minimum_solvent_flowrate = 1 * flue_gas_feed_flowrate # t/h
+    maximum_solvent_flowrate = 3.5 * flue_gas_feed_flowrate # t/h
+    searches = (None, None)
+    if seed is None:
+        searches = search_absorber(nodes, minimum_solvent_flowrate, maximum_solvent_flowrate, solvent_factor, verbose, pool=pool)
+    else:
+        nodes.write_many(seed)
+
+    # Adjust column diameter and solvent flowrate together to meet flooding and CCR targets
+    diameter = nodes.read('diameter')
+    current_solvent_flowrate = nodes.read('solvent_flowrate')
+    flooding_limits = (69.99, 79.99)
+    ccr_limits = (84.90, 90.99)
+
+    def flooding_and_ccr(point):
+        nodes.write_many({'diameter': point[0], 'solvent_flowrate': point[1]})
+        outputs = nodes.evaluate('absorber')
+        if outputs is None or outputs['per_error'] != 0:
+            return None
+        return outputs['flooding'], ccr_from_outputs(outputs)
+
+    # Finite-difference steps and trust region are scaled to the current diameter and solvent flowrate.
+    # With a surrogate, the simulations start from the point where it predicts both targets are met
+    steps = (0.05 * diameter, 0.02 * current_solvent_flowrate)
+    trust = (0.25 * diameter, 0.25 * current_solvent_flowrate)
+    bounds = ((0.1, None), (minimum_solvent_flowrate, maximum_solvent_flowrate))
+    start = predicted_point(nodes, 'absorber', ('flooding', 'ccr'), ('diameter', 'solvent_flowrate'),
+                            (diameter, current_solvent_flowrate), (flooding_limits, ccr_limits), steps, trust, bounds)
+    with nodes.phase('sizing') as phase:
+        sizing = solve_feasibility_2d(flooding_and_ccr, start or (diameter, current_solvent_flowrate), (flooding_limits, ccr_limits),
+                                      steps=steps, trust=trust, bounds=bounds)
+        phase.note(sizing.iterations, sizing.converged)
+    if verbose and not sizing.converged:
+        print(f'Flooding and CCR targets not met after {sizing.calls} simulations')
+    nodes.write_many({'diameter': sizing.x[0], 'solvent_flowrate': sizing.x[1]})
+
+    # Adjust column height for final CCR range, starting from the current height
+    with nodes.phase('final_height') as phase:
+        final_height = specs.final_height.solve(nodes, sum(CCR_TARGET_WINDOW) / 2, guess=nodes.read('packing_height'))
+        phase.note(final_height.iterations, final_height.converged)
+    if verbose and not final_height.converged:
+        print(f'Final CCR target not met after {final_height.calls} simulations')
+    if seed is not None and not (sizing.converged and final_height.converged):
+        return None
+
+    # Final results
+    return {
+        'height': nodes.read('packing_height'),
+        'diameter': nodes.read('diameter'),
+        'flooding': nodes.read('flooding'),
+        'solvent_flowrate': nodes.read('solvent_flowrate'),
+        'ccr': compute_ccr(nodes),
+        'solvent_search_calls': 0 if searches[0] is None else searches[0].calls,
+        'height_search_calls': 0 if searches[1] is None else searches[1].calls,
+        'sizing_calls': sizing.calls,
+        'sizing_iterations': sizing.iterations,
+        'sizing_converged': sizing.converged,
+        'sizing_trajectory': [list(x) for x, _ in sizing.trajectory],
+        'final_height_calls': final_height.calls,
+        'final_height_converged': final_height.converged,
+    }
+
+
+def design_status(design):
+    """Result status of a design (see campaign.run_campaign): 'ok', or 'not_converged' if the absorber missed its targets."""
+    return 'ok' if design['sizing_converged'] and design['final_height_converged'] else 'not_converged'
+
+
+def has_converged_state(nodes):
+    """Whether the document holds a converged solution of the stripper section (e.g. a template),
+    that the next run starts from: the section is built, the last run converged and has results."""
+    built = all(nodes.node(rf'\Data\{kind}\{name}') is not None
+                for kind, names in (('Blocks', TEMPLATE_BLOCKS), ('Streams', TEMPLATE_STREAMS)) for name in names)
+    return built and nodes.read('per_error') == 0 and nodes.read('CO2_product_NH3') is not None
+
+
+def build_stripper_section(nodes, solve=True):
+    """Add the heat exchanger, stripper, condenser and cross-heat exchanger to the flowsheet.
+
+    With `solve=False` the intermediate runs between construction steps are skipped; the
+    flowsheet is still solved once built, as the make-up is computed from its results.
+    """
+
+    # Create heat exchenger prior stripper
+    nodes.add_element('Blocks', 'HXT1' + '!' + 'Heater')
+    nodes.connect('HXT1', 'F(IN)', 'RICHSOLV')
+    nodes.add_element('Streams', 'TOSTRIP' + '!' + 'MATERIAL')
+    nodes.connect('HXT1', 'P(OUT)', 'TOSTRIP')
+    nodes.write(r'\Data\Blocks\HXT1\Input\TEMP', 135) # °C
+    nodes.write(r'\Data\Blocks\HXT1\Input\PRES', 5) # bar
+
+    # Run simulation
+    if solve:
+        nodes.run()
+
+    # Add Stripper and condenser with the streams Vapor, Reflux, CO2, Leansolv
+    nodes.add_element('Blocks', 'STRIP' + '!' + 'RadFrac')
+    nodes.connect('STRIP', 'F(IN)', 'TOSTRIP')
+    nodes.add_element('Streams', 'LEANSOLV' + '!' + 'MATERIAL')
+    nodes.connect('STRIP', 'B(OUT)', 'LEANSOLV')
+    nodes.add_element('Blocks', 'CNDNSR' + '!' + 'Flash2')
+    nodes.add_element('Streams', 'VAPOR' + '!' + 'MATERIAL')
+    nodes.connect('STRIP', 'VD(OUT)', 'VAPOR')
+    nodes.connect('CNDNSR', 'F(IN)', 'VAPOR')
+    nodes.add_element('Streams', 'CO2' + '!' + 'MATERIAL')
+    nodes.add_element('Streams', 'REFLUX' + '!' + 'MATERIAL')
+    nodes.connect('CNDNSR', 'V(OUT)', 'CO2')
+    nodes.connect('CNDNSR', 'L(OUT)', 'REFLUX')
+    nodes.connect('STRIP', 'F(IN)', 'REFLUX')
+
+    # Stripper stages
+    nodes.write(r'\Data\Blocks\STRIP\Input\NSTAGE', 10)
+
+    # Stripper condenser
+    nodes.write(r'\Data\Blocks\STRIP\Input\CONDENSER', 'NONE')
+
+    # Stripper boil-up ratio
+    nodes.write('boilup_ratio', 0.03)
+
+    # Feed stages
+    nodes.write(r'\Data\Blocks\STRIP\Input\FEED_STAGE\TOSTRIP', 1)
+    nodes.write(r'\Data\Blocks\STRIP\Input\FEED_STAGE\REFLUX', 1)
+
+    # Convention of stages
+    nodes.write(r'\Data\Blocks\STRIP\Input\FEED_CONVE2\TOSTRIP', 'ABOVE-STAGE')
+    nodes.write(r'\Data\Blocks\STRIP\Input\FEED_CONVE2\REFLUX', 'ABOVE-STAGE')
+
+    # Stripper pressure
+    nodes.write(r'\Data\Blocks\STRIP\Input\PRES1', 5)
+
+    # Flash temperature and pressure
+    nodes.write(r'\Data\Blocks\CNDNSR\Input\TEMP', 30)
+    nodes.write(r'\Data\Blocks\CNDNSR\Input\PRES', 0)
+
+    # Run simulation
+    if solve:
+        nodes.run()
+
+    # ----- Cross-heat exchanger integration -----
+
+    # Cross-heat exchanger
+    nodes.add_element('Blocks', 'CHXT' + '!' + 'MHeatX')
+    nodes.connect('CHXT', 'HF(IN)', 'LEANSOLV')
+    nodes.disconnect('HXT1', 'F(IN)', 'RICHSOLV')
+    nodes.connect('CHXT', 'CF(IN)', 'RICHSOLV')
+    nodes.add_element('Streams', 'HOTRICH' + '!' + 'MATERIAL')
+    nodes.connect('HXT1', 'F(IN)', 'HOTRICH')
+    nodes.add_element('Streams', 'COLDLEAN' + '!' + 'MATERIAL')
+    nodes.connect('CHXT', 'HP(OUT)', 'COLDLEAN')
+    nodes.connect('CHXT', 'CP(OUT)', 'HOTRICH')
+
+    # Hot outlet stream
+    nodes.write(r'\Data\Blocks\CHXT\Input\OUT\LEANSOLV', 'COLDLEAN')
+
+    # Cold outlet stream
+    nodes.write(r'\Data\Blocks\CHXT\Input\OUT\RICHSOLV', 'HOTRICH')
+
+    # Cross-heat exchanger temperature
+    nodes.write(r'\Data\Blocks\CHXT\Input\SPEC\LEANSOLV', 'TEMP')
+    nodes.write(r'\Data\Blocks\CHXT\Input\VALUE\LEANSOLV', 50)
+
+    # Run simulation
+    nodes.run()
+
+
+def apparent_lean_loading(composition):
+    """Apparent lean loading [mol CO2/mol NH3] from the RECYCLE mole fractions, in APPARENT_LOADING_SPECIES order."""
+    NH3, NH4, NH2COO, CO2, HCO3, CO3 = composition
+    apparent_CO2 = (CO2 + HCO3 + CO3 + NH2COO)
+    apparent_NH3 = (NH3 + NH4 + NH2COO)
+    return float(apparent_CO2 / apparent_NH3)
+
+
+def loading_from_outputs(outputs):
+    """Apparent lean loading from the outputs of a stripper evaluation (see NodeRegistry.evaluate)."""
+    return apparent_lean_loading([outputs[name] for name in RECYCLE_LOADING_VARIABLES])
+
+
+def recycle_loading(nodes):
+    """Evaluate the stripper at the current inputs and return the apparent lean loading of the recycle (None on failure)."""
+    outputs = nodes.evaluate('stripper')
+    if outputs is None or outputs['per_error'] != 0:
+        return None
+    return loading_from_outputs(outputs)
+
+
+@dataclass
+class DesignSpecs:
+    """Design specifications solved in every case, with the state they carry between the cases of
+    a run: each one starts from the solution of the previous case given the same DesignSpecs
+    (final height: from the local slope, as the height search comes first)."""
+    final_height: DesignSpec = field(default_factory=lambda: DesignSpec(
+        'packing_height', absorber_ccr, tolerance=0.99, bounds=(5, 100), initial_guess=20, step=1.0))
+    boilup_ratio: DesignSpec = field(default_factory=lambda: DesignSpec(
+        'boilup_ratio', recycle_loading, tolerance=0.001, bounds=(0.001, 1.0), initial_guess=0.03, step=0.01))
+
+# Outputs predicted by the surrogate for each stage
+SURROGATE_OUTPUTS = {'absorber': {'ccr': ccr_from_outputs, 'flooding': operator.itemgetter('flooding')},
+                     'stripper': {'loading': loading_from_outputs}}
+
+
+def open_surrogate(cache=None, **options):
+    """Surrogate of the absorber and stripper stages (see surrogate.py), trained on the evaluations in `cache` if given."""
+    surrogate = Surrogate(SURROGATE_OUTPUTS, **options)
+    if cache is not None:
+        surrogate.load(cache)
+    return surrogate
+
+
+def build_recycle_section(nodes):
+    """Add the make-up stream, mixer and cooler that feed the RECYCLE stream."""
+
+    # Create and setup the make-up stream
+    nodes.add_element('Blocks', 'MIXER' + '!' + 'Mixer')
+    nodes.add_element('Streams', 'MKP' + '!' + 'MATERIAL')
+    nodes.write(r'\Data\Streams\MKP\Input\TEMP\MIXED', 15)
+    nodes.write(r'\Data\Streams\MKP\Input\PRES\MIXED', 1)
+    nodes.connect('MIXER', 'F(IN)', 'COLDLEAN')
+    nodes.connect('MIXER', 'F(IN)', 'MKP')
+
+    # Create cooler and setup streams
+    nodes.add_element('Streams', 'TOCOOLER' + '!' + 'MATERIAL')
+    nodes.connect('MIXER', 'P(OUT)', 'TOCOOLER')
+    nodes.add_element('Blocks', 'HXT2' + '!' + 'Heater')
+    nodes.connect('HXT2', 'F(IN)', 'TOCOOLER')
+    nodes.add_element('Streams', 'RECYCLE' + '!' + 'MATERIAL')
+    nodes.connect('HXT2', 'P(OUT)', 'RECYCLE')
+    nodes.write(r'\Data\Blocks\HXT2\Input\TEMP', 15) # °C
+    nodes.write(r'\Data\Blocks\HXT2\Input\PRES', 1) # bar
+
+
+def correct_recycle_loading(nodes, lean_loading, build=True, solve=True, boilup_guess=None, pool=None, specs=None):
+    """Add the make-up stream and cooler, then adjust the stripper boil-up ratio until the recycle matches the lean loading.
+
+    With `build=False` the make-up stream and cooler must already be in the flowsheet (template
+    mode) and only the make-up flowrate is updated. `solve=False` skips the run before the
+    boil-up ratio adjustment, which starts from `boilup_guess` if given, or from the result of a
+    k-section search on a DocumentPool with a template. The boil-up ratio is solved with the
+    DesignSpecs `specs` of the run (new ones by default).
+    """
+    spec = (DesignSpecs() if specs is None else specs).boilup_ratio
+
+    # Compute the ammount of MEA for the make-up (from the results before the make-up is connected)
+    with nodes.phase('make_up'):
+        make_up_flowrate = nodes.read('clean_gas_NH3') + nodes.read('CO2_product_NH3')
+        if build:
+            build_recycle_section(nodes)
+        nodes.write_many({'make_up_flowrate': make_up_flowrate, 'make_up_NH3': make_up_flowrate})
+        if solve:
+            nodes.run()
+
+    # Adjust the boil-up ratio until the recycle reaches the lean loading (the pool result is verified on this document)
+    with nodes.phase('boilup_ratio') as phase:
+        if boilup_guess is None and pool is not None and pool.template:
+            tolerance = spec.tolerance
+            search = pool_search(nodes, pool, 'stripper', 'boilup_ratio', loading_from_outputs, *spec.bounds,
+                                 (lean_loading - tolerance, lean_loading + tolerance))
+            boilup_guess = search.x if search.converged else None
+        if boilup_guess is None:
+            boilup_guess = predicted_solution(nodes, 'stripper', 'loading', 'boilup_ratio', *spec.bounds, lean_loading)
+        boilup = spec.solve(nodes, lean_loading, guess=boilup_guess)
+        phase.note(boilup.iterations, boilup.converged)
+    if not boilup.converged:
+        raise RuntimeError(f'Recycle loading did not reach {lean_loading} after {boilup.calls} stripper simulations')
+    boilup_ratio, calculated_loading = boilup.x, boilup.values
+
+    return {'boilup_ratio': boilup_ratio, 'make_up_flowrate': make_up_flowrate, 'lean_loading': calculated_loading,
+            'boilup_calls': boilup.calls}
+
+
+def add_utilities(nodes):
+    """Add utilities so that the economics are activated in the simulation file."""
+    nodes.write(r'\Data\Blocks\HXT1\Input\UTILITY_ID', 'U-2')
+    nodes.write(r'\Data\Blocks\HXT2\Input\UTILITY_ID', 'U-4')
+    nodes.write(r'\Data\Blocks\STRIP\Input\REB_UTIL', 'U-2')
+    nodes.write(r'\Data\Blocks\CNDNSR\Input\UTILITY_ID', 'U-3')
+    nodes.run()
+
+
+def validate_template(nodes):
+    """Check that the downstream flowsheet is complete and converges; raises RuntimeError otherwise."""
+    missing = [name for kind, names in (('Blocks', TEMPLATE_BLOCKS), ('Streams', TEMPLATE_STREAMS))
+               for name in names if nodes.node(rf'\Data\{kind}\{name}') is None]
+    if missing:
+        raise RuntimeError(f'Template flowsheet is missing {", ".join(missing)}')
+    nodes.run()
+    per_error = nodes.read('per_error')
+    if per_error != 0:
+        raise RuntimeError(f'Template flowsheet does not converge (PER_ERROR = {per_error})')
+
+
+def build_template(Aspen, template_path, lean_loading=0.12, case=None, intermediate_solves=True):
+    """Build the full flowsheet once on a document holding the base flowsheet, validate it and
+    save it as the derived archive `template_path` (see design_case(template=True)).
+
+    `case` is an optional representative flue gas case the template is converged at.
+    """
+    nodes = NodeRegistry(Aspen)
+    if case is not None:
+        set_flue_gas(nodes, case)
+    set_lean_solvent(nodes, lean_loading)
+    nodes.run()
+    solve = intermediate_solves or not has_converged_state(nodes)
+    build_stripper_section(nodes, solve=solve)
+    correct_recycle_loading(nodes, lean_loading, solve=solve)
+    add_utilities(nodes)
+    validate_template(nodes)
+    Aspen.SaveAs(os.path.abspath(template_path))
+    return template_path
+
+
+def design_case(Aspen, case, lean_loading=0.12, verbose=True, cache=None, template=False, intermediate_solves=True,
+                warm_start=None, surrogate=None, pool=None, journal=None, profile=False, specs=None):
+    """Run the full AsPyCC pipeline for one flue gas case and return the final design.
+
+    `Aspen` must hold the base flowsheet (absorber only), e.g. freshly loaded with InitFromArchive2,
+    or with `template=True` the full flowsheet saved by build_template. `lean_loading` is in
+    mol CO2/mol NH3 [0.1-0.2]. A design whose absorber did not converge is still returned (see
+    design_status). The design also reports the simulator runs of the case, their solve time
+    against polling overhead [s] and the FindNode round trips saved by the node-handle cache.
+    """
+    start = engine.statistics.snapshot()
+    pool_evaluations = 0 if pool is None else pool.evaluations
+    profiler = Profiler() if profile else None
+    nodes = NodeRegistry(Aspen, cache=cache, surrogate=surrogate, journal=journal, profiler=profiler)
+    with nodes.phase('inputs'):
+        set_flue_gas(nodes, case)
+        set_lean_solvent(nodes, lean_loading)
+    with nodes.phase('screening'):
+        screen_case(nodes, 3.5 * case['flowrate'])
+
+    # ----- AsPyCC: Absorber Design ------
+    seed = None if warm_start is None else warm_start_seed(warm_start, case['flowrate'])
+    specs = DesignSpecs() if specs is None else specs
+    design = design_absorber(nodes, case['flowrate'], verbose=verbose, seed=seed, pool=pool, specs=specs)
+    warm_start_failed = seed is not None and design is None
+    if design is None:
+        design = design_absorber(nodes, case['flowrate'], verbose=verbose, pool=pool, specs=specs)
+    if journal is not None:
+        journal.checkpoint('absorber', dict(design, flue_gas_flowrate=case['flowrate']))
+
+    # ----- AsPyCC: Heat exchanger and stripper design -----
+    solve = intermediate_solves or not has_converged_state(nodes)
+    if not template:
+        with nodes.phase('stripper_construction'):
+            build_stripper_section(nodes, solve=solve)
+
+    # -----Recycle-loading correction -----
+    boilup_guess = None if warm_start is None else warm_start.get('boilup_ratio')
+    design.update(correct_recycle_loading(nodes, lean_loading, build=not template, solve=solve, boilup_guess=boilup_guess, pool=pool,
+                                          specs=specs))
+    if journal is not None:
+        journal.checkpoint('recycle_loading', dict(design, flue_gas_flowrate=case['flowrate']))
+    with nodes.phase('utilities'):
+        if template:
+            nodes.sync() # utilities are already in the template
+        else:
+            add_utilities(nodes)
+    runs = engine.statistics.since(start)
+    parallel_evaluations = 0 if pool is None else pool.evaluations - pool_evaluations
+    design.update({'flue_gas_flowrate': case['flowrate'], 'warm_start': seed is not None and not warm_start_failed,
+                   'warm_start_failed': warm_start_failed, 'parallel_evaluations': parallel_evaluations})
+    # Runs of the pool documents are counted as simulator runs of the case
+    design.update({'simulator_runs': runs.runs + parallel_evaluations, 'solve_time': runs.solve_time, 'wait_overhead': runs.wait_overhead,
+                   'node_lookups': nodes.counters.lookups, 'round_trips_saved': nodes.counters.round_trips_saved})
+    if profiler is not None:
+        design['profile'] = profiler.report()
+    return design
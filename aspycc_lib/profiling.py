@@ -0,0 +1,158 @@
+"""Per-phase profiling of the design pipeline.
+    Each named phase of a case (solvent flowrate and packing height searches, diameter and
+    solvent sizing, final height, stripper construction, boil-up ratio loop, ...) records its
+    wall time, simulator runs with their solve time against polling overhead, the COM traffic
+    through the node registry (FindNode calls, reads, writes, element calls) and the
+    iterations of its search or solver. design_case(profile=True) returns the per-case profile
+    as a JSON-ready dict, profile_summary aggregates a campaign and write_prometheus exports the
+    summary as a Prometheus textfile. When profiling is off, a phase is a shared no-op object.
+"""
+
+import dataclasses
+import os
+import time
+
+from dataclasses import dataclass
+
+from aspycc_lib import engine
+
+# Phase measurements exported to Prometheus: summary field -> (metric name, help text)
+PROMETHEUS_METRICS = {
+    'wall_time': ('phase_wall_seconds', 'Wall time spent in the phase'),
+    'solve_time': ('phase_solve_seconds', 'Simulator solve time in the phase'),
+    'wait_overhead': ('phase_wait_overhead_seconds', 'Time between the end of a run and the poll that saw it'),
+    'runs': ('phase_simulator_runs', 'Simulator runs (Run2 calls) in the phase'),
+    'lookups': ('phase_findnode_calls', 'FindNode calls in the phase'),
+    'reads': ('phase_com_reads', 'Node values read in the phase'),
+    'writes': ('phase_com_writes', 'Node values written in the phase'),
+    'iterations': ('phase_iterations', 'Search and solver iterations in the phase'),
+}
+
+
+@dataclass
+class PhaseProfile:
+    """Measurements of one phase of a case, summed over every time the phase was entered."""
+    wall_time: float = 0.0
+    runs: int = 0
+    hung: int = 0
+    polls: int = 0
+    solve_time: float = 0.0
+    wait_overhead: float = 0.0
+    lookups: int = 0
+    round_trips_saved: int = 0
+    reads: int = 0
+    writes: int = 0
+    element_calls: int = 0
+    iterations: int = 0
+    converged: bool = None # outcome of the last search or solver of the phase
+
+    def note(self, iterations=0, converged=None):
+        """Report the iterations of a search or solver run in the phase (not its simulator calls, which are
+        counted as runs), and whether it converged."""
+        self.iterations += iterations
+        if converged is not None:
+            self.converged = bool(converged)
+
+
+class _Phase:
+    # Context manager measuring one phase: deltas of the run statistics and node counters
+    def __init__(self, profile, counters):
+        self.profile = profile
+        self.counters = counters
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        self._runs = engine.statistics.snapshot()
+        self._counters = dataclasses.replace(self.counters)
+        return self.profile
+
+    def __exit__(self, *exc_info):
+        profile = self.profile
+        profile.wall_time += time.perf_counter() - self._start
+        runs = engine.statistics.since(self._runs)
+        profile.runs += runs.runs
+        profile.hung += runs.hung
+        profile.polls += runs.polls
+        profile.solve_time += runs.solve_time
+        profile.wait_overhead += runs.wait_overhead
+        profile.lookups += self.counters.lookups - self._counters.lookups
+        profile.round_trips_saved += self.counters.round_trips_saved - self._counters.round_trips_saved
+        profile.reads += self.counters.reads - self._counters.reads
+        profile.writes += self.counters.writes - self._counters.writes
+        profile.element_calls += self.counters.element_calls - self._counters.element_calls
+
+
+class _NullPhase:
+    # Phase used when profiling is off
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def note(self, iterations=0, converged=None):
+        pass
+
+
+NULL_PHASE = _NullPhase()
+
+
+class Profiler:
+    """Phase profiles of one case, in the order the phases were first entered."""
+
+    def __init__(self):
+        self.phases = {}
+        self._start = time.perf_counter()
+
+    def phase(self, name, counters):
+        """Context manager profiling the phase `name`; `counters` are the NodeCounters of the document."""
+        return _Phase(self.phases.setdefault(name, PhaseProfile()), counters)
+
+    def report(self):
+        """Per-case profile: wall time of the case [s] and the measurements of every phase."""
+        wall_time = time.perf_counter() - self._start
+        phases = {name: dataclasses.asdict(profile) for name, profile in self.phases.items()}
+        return {'wall_time': wall_time, 'unprofiled_time': wall_time - sum(profile.wall_time for profile in self.phases.values()),
+                'phases': phases}
+
+
+def profile_summary(results):
+    """Campaign summary of the per-case profiles in run_campaign results (or design dicts):
+    totals of every phase over the cases, their share of the wall time and mean iterations."""
+    profiles = []
+    for result in results:
+        design = result.get('design') if 'status' in result else result
+        if design is not None and design.get('profile') is not None:
+            profiles.append(design['profile'])
+    wall_time = sum(profile['wall_time'] for profile in profiles)
+    phases = {}
+    for profile in profiles:
+        for name, measurements in profile['phases'].items():
+            phase = phases.setdefault(name, {'cases': 0, 'converged': 0})
+            phase['cases'] += 1
+            phase['converged'] += int(bool(measurements['converged']))
+            for field, value in measurements.items():
+                if field != 'converged':
+                    phase[field] = phase.get(field, 0) + value
+    for phase in phases.values():
+        phase['share'] = phase['wall_time'] / wall_time if wall_time else None
+        phase['mean_wall_time'] = phase['wall_time'] / phase['cases']
+        phase['mean_iterations'] = phase['iterations'] / phase['cases']
+    return {'cases': len(profiles), 'wall_time': wall_time,
+            'unprofiled_time': sum(profile['unprofiled_time'] for profile in profiles), 'phases': phases}
+
+
+def write_prometheus(summary, path, prefix='aspycc'):
+    """Write a profile_summary as a Prometheus textfile (e.g. for the node exporter textfile collector).
+    The file is replaced atomically, so a scrape never sees it half written."""
+    lines = [f'# HELP {prefix}_profiled_cases Cases with a profile', f'# TYPE {prefix}_profiled_cases gauge',
+             f'{prefix}_profiled_cases {summary["cases"]}',
+             f'# HELP {prefix}_wall_seconds Wall time of the profiled cases', f'# TYPE {prefix}_wall_seconds gauge',
+             f'{prefix}_wall_seconds {summary["wall_time"]:.6g}']
+    for field, (metric, description) in PROMETHEUS_METRICS.items():
+        lines += [f'# HELP {prefix}_{metric} {description}', f'# TYPE {prefix}_{metric} gauge']
+        lines += [f'{prefix}_{metric}{{phase="{name}"}} {phase[field]:.6g}' for name, phase in summary['phases'].items()]
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'w') as file:
+        file.write('\n'.join(lines) + '\n')
+    os.replace(temporary_path, path)
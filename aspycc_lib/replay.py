@@ -0,0 +1,499 @@
+"""Record and replay simulator traces, to run the design algorithms without Aspen Plus.
+    RecordingBackend wraps the documents of another backend (Aspen Plus through COM, or the
+    stand-in) and appends every call made through the object model to a JSON Lines trace:
+    FindNode lookups, node reads and writes, Run2 (with its solve time), Reinit,
+    Elements.Add/Remove, InitFromArchive2 and SaveAs. Each document writes its own file.
+    ReplayBackend opens documents that serve the recorded responses. A run is identified by
+    the flowsheet topology and the inputs written so far; outputs read after it are those of
+    the recorded run with the same inputs, or, between recorded points, a local linear
+    interpolation of the nearest converged runs of the same topology. Replayed runs take a
+    configurable artificial solve time.
+"""
+
+import dataclasses
+import glob
+import json
+import os
+import time
+
+import numpy as np
+
+from dataclasses import dataclass, field
+
+from aspycc_lib.journal import Journal
+from aspycc_lib.nodes import is_output_path, normalize_path
+
+# Run status read by the pipeline (see nodes.VARIABLES['per_error']): only converged runs are interpolated
+STATUS_PATH = r'Data\Results Summary\Run-Status\Output\PER_ERROR'
+
+
+def _element(path):
+    # (kind, name) of the block or stream a tree path belongs to, None for other paths
+    parts = path.split('\\')
+    if len(parts) > 2 and parts[0] == 'Data' and parts[1] in ('Blocks', 'Streams'):
+        return parts[1], parts[2]
+    return None
+
+
+# ----- Recording -----
+
+class _RecordingNode:
+    def __init__(self, node, path, record):
+        self._node = node
+        self._path = path
+        self._record = record
+
+    @property
+    def Value(self):
+        value = self._node.Value
+        self._record({'event': 'read', 'path': self._path, 'value': value})
+        return value
+
+    @Value.setter
+    def Value(self, value):
+        self._record({'event': 'write', 'path': self._path, 'value': value})
+        self._node.Value = value
+
+
+class _RecordingElements:
+    def __init__(self, elements, path, record):
+        self._elements = elements
+        self._path = path
+        self._record = record
+
+    def __call__(self, name):
+        return _RecordingElement(self._elements(name), f'{self._path}\\{name}' if self._path else name, self._record)
+
+    def Add(self, name):
+        self._record({'event': 'add', 'collection': self._path, 'name': name})
+        return self._elements.Add(name)
+
+    def Remove(self, name):
+        self._record({'event': 'remove', 'collection': self._path, 'name': name})
+        return self._elements.Remove(name)
+
+
+class _RecordingElement:
+    def __init__(self, element, path, record):
+        self._element = element
+        self.Elements = _RecordingElements(element.Elements, path, record)
+
+    def __getattr__(self, name):
+        return getattr(self._element, name)
+
+
+class _RecordingTree:
+    def __init__(self, tree, record):
+        self._tree = tree
+        self._record = record
+        self.Elements = _RecordingElements(tree.Elements, '', record)
+
+    def FindNode(self, path):
+        node = self._tree.FindNode(path)
+        path = normalize_path(path)
+        self._record({'event': 'find', 'path': path, 'found': node is not None})
+        return None if node is None else _RecordingNode(node, path, self._record)
+
+
+class _RecordingEngine:
+    def __init__(self, engine, record):
+        self._engine = engine
+        self._record = record
+        self._started = None
+
+    def Run2(self, *args):
+        self._record({'event': 'run'})
+        self._started = time.perf_counter()
+        return self._engine.Run2(*args)
+
+    @property
+    def IsRunning(self):
+        running = self._engine.IsRunning
+        if not running and self._started is not None:
+            self._record({'event': 'solved', 'solve_time': time.perf_counter() - self._started})
+            self._started = None
+        return running
+
+    def Stop(self):
+        self._record({'event': 'stop'})
+        return self._engine.Stop()
+
+
+class RecordingAspen:
+    """Wraps a simulation document and appends every call made through it to `trace` (a Journal)."""
+
+    def __init__(self, Aspen, trace):
+        self.__dict__['_Aspen'] = Aspen
+        self.__dict__['_trace'] = trace
+        self.__dict__['Tree'] = _RecordingTree(Aspen.Tree, trace.write)
+        self.__dict__['Engine'] = _RecordingEngine(Aspen.Engine, trace.write)
+
+    def __getattr__(self, name):
+        return getattr(self._Aspen, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._Aspen, name, value) # e.g. Visible, SuppressDialogs
+
+    def InitFromArchive2(self, path, *args):
+        self._trace.write({'event': 'init', 'archive': os.path.basename(path)})
+        return self._Aspen.InitFromArchive2(path, *args)
+
+    def SaveAs(self, path, *args):
+        self._trace.write({'event': 'save', 'archive': os.path.basename(path)})
+        return self._Aspen.SaveAs(path, *args)
+
+    def Reinit(self):
+        self._trace.write({'event': 'reinit'})
+        return self._Aspen.Reinit()
+
+    def Close(self):
+        self._trace.write({'event': 'close'})
+        self._trace.close()
+        return self._Aspen.Close()
+
+
+@dataclass
+class RecordingBackend:
+    """Backend whose documents are those of `backend`, recorded to a new trace file in `trace_dir`.
+    `template_path` replaces the one of `backend` (see campaign.prepare_template)."""
+    backend: object
+    trace_dir: str
+    template_path: str = None
+
+    def __post_init__(self):
+        self.backend = dataclasses.replace(self.backend, template_path=self.template_path)
+
+    @property
+    def archive_path(self):
+        return self.backend.archive_path
+
+    def open(self):
+        os.makedirs(self.trace_dir, exist_ok=True)
+        # Files are named by creation time, so that replay loads archives saved by earlier documents first
+        trace = Journal(os.path.join(self.trace_dir, f'{time.time_ns()}-{os.getpid()}.jsonl'))
+        Aspen = RecordingAspen(self.backend.open(), trace)
+        self.reset(Aspen) # the document state is recorded from its first load
+        return Aspen
+
+    def reset(self, Aspen):
+        self.backend.reset(Aspen)
+
+    def close(self, Aspen):
+        self.backend.close(Aspen)
+
+    def server_processes(self):
+        return self.backend.server_processes()
+
+    def kill_servers(self, pids):
+        self.backend.kill_servers(pids)
+
+    def fingerprint(self):
+        return self.backend.fingerprint()
+
+
+# ----- Replay -----
+
+class _DocumentState:
+    # What identifies a run: inputs written since the archive was loaded, and net changes to the topology
+    def __init__(self, inputs=None, elements=None):
+        self.inputs = dict(inputs or {})
+        self.elements = dict(elements or {}) # (collection, name) -> True if added, False if removed
+
+    def copy(self):
+        return _DocumentState(self.inputs, self.elements)
+
+    def change(self, collection, name, added):
+        key = (collection, name.partition('!')[0])
+        if self.elements.get(key) == (not added):
+            del self.elements[key] # e.g. a port disconnected after being connected
+        else:
+            self.elements[key] = added
+
+    def exists(self, kind, name, base):
+        added = self.elements.get((f'Data\\{kind}', name))
+        return added if added is not None else (kind, name) in base
+
+    def key(self):
+        """Topology, non-numeric inputs and names of the numeric inputs; runs are only compared within a key."""
+        numeric = sorted(path for path, value in self.inputs.items() if _numeric(value))
+        text = sorted((path, str(value)) for path, value in self.inputs.items() if not _numeric(value))
+        return tuple(sorted(self.elements.items())), tuple(text), tuple(numeric)
+
+    def point(self, key):
+        return np.array([float(self.inputs[path]) for path in key[2]])
+
+
+def _numeric(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+@dataclass
+class RecordedRun:
+    point: np.ndarray
+    outputs: dict = field(default_factory=dict)
+    solve_time: float = 0.0
+
+
+class Trace:
+    """Index of one or more recorded trace files: runs grouped by key (see _DocumentState.key),
+    archives saved during the recording, and the values read before being written (e.g.
+    inputs of the base file)."""
+
+    def __init__(self, paths):
+        if isinstance(paths, (str, os.PathLike)):
+            paths = [paths]
+        files = []
+        for path in paths:
+            files += sorted(glob.glob(os.path.join(path, '*.jsonl'))) if os.path.isdir(path) else [path]
+        self.runs = {}
+        self.archives = {}
+        self.defaults = {}
+        self.base = set() # blocks and streams of the base file
+        self.events = 0
+        for path in files:
+            self._load(path)
+
+    def _load(self, path):
+        state, run = _DocumentState(), None
+        with open(path, encoding='utf-8') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue # last line cut by a crash
+                self.events += 1
+                event = record['event']
+                if event == 'write':
+                    state.inputs[record['path']] = record['value']
+                elif event == 'read':
+                    if is_output_path(record['path']):
+                        if run is not None:
+                            run.outputs[record['path']] = record['value']
+                    elif record['path'] not in state.inputs:
+                        self.defaults.setdefault(record['path'], record['value'])
+                elif event == 'run':
+                    key = state.key()
+                    run = RecordedRun(state.point(key))
+                    self.runs.setdefault(key, []).append(run)
+                elif event == 'solved' and run is not None:
+                    run.solve_time = record['solve_time']
+                elif event == 'find':
+                    element = _element(record['path'])
+                    if element is not None and record['found'] and (f'Data\\{element[0]}', element[1]) not in state.elements:
+                        self.base.add(element)
+                elif event in ('add', 'remove'):
+                    state.change(record['collection'], record['name'], event == 'add')
+                elif event == 'reinit':
+                    run = None
+                elif event == 'init':
+                    state, run = self.archives.get(record['archive'], _DocumentState()).copy(), None
+                elif event == 'save':
+                    self.archives[record['archive']] = state.copy()
+
+    def __len__(self):
+        return sum(len(runs) for runs in self.runs.values())
+
+    def nearest(self, key, point, path, neighbours):
+        """Recorded runs of `key` holding `path`, nearest first, with their scaled distances to `point`."""
+        runs = [run for run in self.runs.get(key, []) if path in run.outputs]
+        if not runs:
+            return [], np.array([])
+        points = np.array([run.point for run in runs]).reshape(len(runs), -1)
+        scale = np.ptp(points, axis=0) if len(runs) > 1 else np.ones(points.shape[1])
+        scale[scale == 0] = 1.0
+        distances = np.sqrt(np.sum(((points - point) / scale) ** 2, axis=1))
+        order = np.argsort(distances, kind='stable')[:neighbours]
+        return [runs[i] for i in order], distances[order]
+
+
+def _interpolate(runs, distances, point, path):
+    # Local linear fit of the output on the inputs of the nearest runs, weighted by inverse distance,
+    # with a small ridge term for directions the runs do not span (e.g. a one-variable search)
+    if distances[0] == 0 or len(runs) == 1:
+        return runs[0].outputs[path]
+    X = np.array([run.point - point for run in runs])
+    y = np.array([float(run.outputs[path]) for run in runs])
+    scale = np.abs(X).max(axis=0)
+    scale[scale == 0] = 1.0
+    weights = 1 / distances
+    A = np.hstack([np.ones((len(runs), 1)), X / scale]) * weights[:, None]
+    ridge = 1e-6 * np.eye(A.shape[1])
+    ridge[0, 0] = 0.0
+    coefficients = np.linalg.solve(A.T @ A + ridge, A.T @ (y * weights))
+    return float(coefficients[0])
+
+
+class _ReplayNode:
+    def __init__(self, document, path):
+        self._document = document
+        self._path = path
+
+    @property
+    def Value(self):
+        return self._document._read(self._path)
+
+    @Value.setter
+    def Value(self, value):
+        self._document._state.inputs[self._path] = value
+
+
+class _ReplayElements:
+    def __init__(self, document, path):
+        self._document = document
+        self._path = path
+
+    def __call__(self, name):
+        return _ReplayElement(self._document, f'{self._path}\\{name}' if self._path else name)
+
+    def Add(self, name):
+        self._document._state.change(self._path, name, True)
+
+    def Remove(self, name):
+        self._document._state.change(self._path, name, False)
+
+
+class _ReplayElement:
+    def __init__(self, document, path):
+        self.Elements = _ReplayElements(document, path)
+
+
+class _ReplayTree:
+    def __init__(self, document):
+        self._document = document
+        self.Elements = _ReplayElements(document, '')
+
+    def FindNode(self, path):
+        path = normalize_path(path)
+        element = _element(path)
+        if element is not None and not self._document._state.exists(*element, self._document.trace.base):
+            return None
+        return _ReplayNode(self._document, path)
+
+
+class _ReplayEngine:
+    def __init__(self, document):
+        self._document = document
+        self._busy_until = 0.0
+        self.run_count = 0
+
+    def Run2(self, *args):
+        self.run_count += 1
+        self._busy_until = time.perf_counter() + self._document._run()
+
+    @property
+    def IsRunning(self):
+        return time.perf_counter() < self._busy_until
+
+    def Stop(self):
+        self._busy_until = 0.0
+
+
+class ReplayAspen:
+    """Document serving the responses of a Trace (see the module docstring).
+
+    Each run takes `latency` seconds plus `latency_scale` times the recorded solve time of the
+    nearest recorded run. `neighbours` is the number of recorded runs used for interpolation.
+    """
+
+    def __init__(self, trace, latency=0.0, latency_scale=0.0, neighbours=8):
+        self.trace = trace
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.neighbours = neighbours
+        self.Visible = False
+        self.SuppressDialogs = 0
+        self.Tree = _ReplayTree(self)
+        self.Engine = _ReplayEngine(self)
+        self.interpolated = 0 # output reads served by interpolation
+        self._state = _DocumentState()
+        self._run_state = None # state at the last run; None before the first run and after Reinit
+        self._outputs = {}
+
+    def _run(self):
+        self._run_state = self._state.copy()
+        self._outputs = {}
+        if not self.latency_scale:
+            return self.latency
+        key = self._run_state.key()
+        runs, _ = self.trace.nearest(key, self._run_state.point(key), STATUS_PATH, 1)
+        return self.latency + (self.latency_scale * runs[0].solve_time if runs else 0.0)
+
+    def _read(self, path):
+        if not is_output_path(path):
+            return self._state.inputs.get(path, self.trace.defaults.get(path))
+        if self._run_state is None:
+            return None
+        if path not in self._outputs:
+            self._outputs[path] = self._output(path)
+        return self._outputs[path]
+
+    def _output(self, path):
+        key = self._run_state.key()
+        point = self._run_state.point(key)
+        runs, distances = self.trace.nearest(key, point, path, self.neighbours)
+        if not runs:
+            raise KeyError(f'No recorded run of this flowsheet reads {path}')
+        if path == STATUS_PATH or not _numeric(runs[0].outputs[path]):
+            return runs[0].outputs[path]
+        # Interpolate between converged runs only
+        converged = [(run, distance) for run, distance in zip(runs, distances) if run.outputs.get(STATUS_PATH, 0) == 0]
+        if not converged or converged[0][1] > distances[0]:
+            return runs[0].outputs[path] # the nearest run failed
+        runs, distances = zip(*converged)
+        if distances[0] > 0:
+            self.interpolated += 1
+        return _interpolate(list(runs), np.array(distances), point, path)
+
+    def InitFromArchive2(self, path, *args):
+        state = None
+        if os.path.isfile(path):
+            # Archive saved by another replay document (e.g. a template built by the parent process)
+            try:
+                with open(path, encoding='utf-8') as file:
+                    saved = json.load(file)
+                state = _DocumentState(saved['inputs'], {tuple(key): added for key, added in saved['elements']})
+            except (UnicodeDecodeError, ValueError, KeyError, TypeError):
+                pass
+        if state is None:
+            state = self.trace.archives.get(os.path.basename(path), _DocumentState())
+        self._state, self._run_state, self._outputs = state.copy(), None, {}
+
+    def SaveAs(self, path, *args):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'inputs': self._state.inputs, 'elements': [[list(key), added] for key, added in self._state.elements.items()]}, file)
+
+    def Reinit(self):
+        self._run_state, self._outputs = None, {}
+
+    def Close(self):
+        pass
+
+
+@dataclass
+class ReplayBackend:
+    """Documents replaying the traces in `trace_paths` (files or directories written by RecordingBackend).
+    `options` are passed to ReplayAspen, e.g. latency in seconds."""
+    trace_paths: list
+    archive_path: str = 'replay.bkp'
+    options: dict = field(default_factory=dict)
+    template_path: str = None
+
+    def open(self):
+        Aspen = ReplayAspen(Trace(self.trace_paths), **self.options)
+        self.reset(Aspen)
+        return Aspen
+
+    def reset(self, Aspen):
+        Aspen.InitFromArchive2(self.archive_path if self.template_path is None else os.path.abspath(self.template_path))
+
+    def close(self, Aspen):
+        Aspen.Close()
+
+    def server_processes(self):
+        return set()
+
+    def kill_servers(self, pids):
+        pass
+
+    def fingerprint(self):
+        return f'replay:{sorted(map(os.fspath, self.trace_paths))}'
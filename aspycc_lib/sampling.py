@@ -0,0 +1,114 @@
+"""Flue gas sample generation (used by Data_generation.ipynb).
+    Draws exactly the requested number of scrambled Sobol points per industry of the flue gas
+    database (Industry, {species}_min, {species}_max), with the flue gas flowrate as one more
+    Sobol dimension. Compositions are closed to 100 % or, when H2O is in the database, H2O is
+    computed by balance and the points outside its range are rejected; both are done on the
+    whole sample matrix at once. Samples are produced in chunks and streamed to CSV or Parquet,
+    so the number of points is not limited by memory. The output has the structure read by
+    AsPyCC.py (Industry, Flowrate (t/h), N2, O2, CO2, H2O, H2, CO, CH4).
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from scipy.stats import qmc
+
+# Species of the flue gas database, in the order they are sampled (H2O last, computed by balance)
+SAMPLED_SPECIES = ['N2', 'O2', 'H2', 'CO', 'CO2', 'CH4', 'H2O']
+H2O_INDEX = SAMPLED_SPECIES.index('H2O')
+
+# Columns of the generated flue gas data (see read_case in pipeline.py)
+OUTPUT_COLUMNS = ['Industry', 'Flowrate (t/h)', 'N2', 'O2', 'CO2', 'H2O', 'H2', 'CO', 'CH4']
+
+# Consecutive Sobol batches without a single point in the H2O range before giving up
+MAX_EMPTY_BATCHES = 8
+
+
+def sampling_problems(database):
+    """(industry, lower bounds, upper bounds) for every row of the flue gas database, in SAMPLED_SPECIES order [wt.%]."""
+    lower = database[[f'{species}_min' for species in SAMPLED_SPECIES]].to_numpy(dtype=float)
+    upper = database[[f'{species}_max' for species in SAMPLED_SPECIES]].to_numpy(dtype=float)
+    return list(zip(database['Industry'], lower, upper))
+
+
+def sample_industry(lower, upper, number_of_samples, seed=None, flowrate_range=(100, 500), chunk_size=65536):
+    """Yield (flowrates, compositions) chunks with exactly `number_of_samples` rows in total.
+
+    Species with both bounds at zero are not sampled. `compositions` has one column per
+    species of SAMPLED_SPECIES [wt.%]. Points are drawn in power-of-two batches of the
+    scrambled Sobol sequence, which keeps its balance properties.
+    """
+    lower, upper = np.asarray(lower, dtype=float), np.asarray(upper, dtype=float)
+    active = (lower != 0) | (upper != 0)
+    balance = bool(active[H2O_INDEX])
+    sampled = active.copy()
+    sampled[H2O_INDEX] = False
+    if not balance and not sampled.any():
+        raise ValueError('No species to sample')
+    sampler = qmc.Sobol(d=int(sampled.sum()) + 1, scramble=True, seed=seed)
+    batch = 2 ** int(np.ceil(np.log2(max(min(number_of_samples, chunk_size), 2))))
+    remaining, empty_batches = number_of_samples, 0
+    while remaining > 0:
+        points = sampler.random(batch)
+        flowrates = flowrate_range[0] + points[:, 0] * (flowrate_range[1] - flowrate_range[0])
+        compositions = np.zeros((batch, len(SAMPLED_SPECIES)))
+        compositions[:, sampled] = lower[sampled] + points[:, 1:] * (upper[sampled] - lower[sampled])
+        if balance:
+            # Compute H2O by balance and keep the points with H2O within its range
+            compositions[:, H2O_INDEX] = 100 - compositions.sum(axis=1)
+            valid = (compositions[:, H2O_INDEX] >= lower[H2O_INDEX]) & (compositions[:, H2O_INDEX] <= upper[H2O_INDEX])
+            flowrates, compositions = flowrates[valid], compositions[valid]
+        else:
+            # Scale the samples so that they sum to 100% for each row
+            compositions *= 100 / compositions.sum(axis=1, keepdims=True)
+        if len(flowrates) == 0:
+            empty_batches += 1
+            if empty_batches >= MAX_EMPTY_BATCHES:
+                raise ValueError('The H2O range cannot be met by balance with the ranges of the other species')
+            continue
+        empty_batches = 0
+        take = min(remaining, len(flowrates))
+        remaining -= take
+        yield flowrates[:take], compositions[:take]
+
+
+def iter_samples(database, number_of_samples, seed=0, flowrate_range=(100, 500), chunk_size=65536):
+    """Yield DataFrames (OUTPUT_COLUMNS) with `number_of_samples` rows per industry of the database.
+
+    Every industry gets its own random stream derived from `seed`, so the output is reproducible.
+    """
+    problems = sampling_problems(database)
+    seeds = [np.random.default_rng(sequence) for sequence in np.random.SeedSequence(seed).spawn(len(problems))]
+    for (industry, lower, upper), industry_seed in zip(problems, seeds):
+        for flowrates, compositions in sample_industry(lower, upper, number_of_samples, industry_seed, flowrate_range, chunk_size):
+            chunk = pd.DataFrame(compositions, columns=SAMPLED_SPECIES)
+            chunk.insert(0, 'Flowrate (t/h)', flowrates)
+            chunk.insert(0, 'Industry', industry)
+            yield chunk[OUTPUT_COLUMNS]
+
+
+def write_samples(database, path, number_of_samples, seed=0, flowrate_range=(100, 500), chunk_size=65536):
+    """Stream the samples of iter_samples to a .csv or .parquet file (Parquet needs pyarrow); returns the number of rows."""
+    rows = 0
+    if os.fspath(path).endswith('.parquet'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+        try:
+            for chunk in iter_samples(database, number_of_samples, seed, flowrate_range, chunk_size):
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows
+    with open(path, 'w', newline='') as file:
+        for chunk in iter_samples(database, number_of_samples, seed, flowrate_range, chunk_size):
+            chunk.to_csv(file, header=rows == 0, index=False)
+            rows += len(chunk)
+    return rows
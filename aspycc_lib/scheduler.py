@@ -0,0 +1,57 @@
+"""Case scheduling for warm-started campaigns.
+    Flue gas rows are ordered along a nearest-neighbour path in feed space (flowrate and
+    composition, each scaled to unit variance), so that consecutive cases have similar
+    designs and each one can start from the design of the previous one (see
+    design_case(warm_start=...)). warm_start_summary reports the simulator calls per case
+    of warm and cold starts.
+"""
+
+import numpy as np
+
+from aspycc_lib.nodes import FLUE_GAS_SPECIES
+
+# Feed-space coordinates of a case
+FEED_FEATURES = ['flowrate'] + FLUE_GAS_SPECIES
+
+
+def nearest_neighbour_order(cases, features=FEED_FEATURES, start=None):
+    """Order (index, case) pairs along a greedy nearest-neighbour path in feed space.
+
+    The path starts at the case with index `start`, or at the smallest flue gas flowrate.
+    """
+    cases = list(cases)
+    if len(cases) < 3:
+        return cases
+    points = np.array([[case.get(feature, 0.0) for feature in features] for _, case in cases], dtype=float)
+    spread = points.std(axis=0)
+    points = (points - points.mean(axis=0)) / np.where(spread > 0, spread, 1.0)
+    if start is None:
+        current = int(np.argmin([case['flowrate'] for _, case in cases]))
+    else:
+        current = next(position for position, (index, _) in enumerate(cases) if index == start)
+
+    remaining = np.ones(len(cases), dtype=bool)
+    order = []
+    for _ in range(len(cases)):
+        order.append(current)
+        remaining[current] = False
+        if not remaining.any():
+            break
+        distances = np.sum((points - points[current]) ** 2, axis=1)
+        distances[~remaining] = np.inf
+        current = int(np.argmin(distances))
+    return [cases[position] for position in order]
+
+
+def warm_start_summary(results):
+    """Average simulator runs per case for warm starts, cold starts and failed warm starts
+    (cold starts after a warm start that did not converge), from run_campaign results."""
+    runs = {'warm': [], 'cold': [], 'fallback': []}
+    for result in results:
+        if result['status'] != 'ok':
+            continue
+        design = result['design']
+        kind = 'warm' if design.get('warm_start') else 'fallback' if design.get('warm_start_failed') else 'cold'
+        runs[kind].append(design['simulator_runs'])
+    return {kind: {'cases': len(values), 'mean_simulator_runs': float(np.mean(values)) if values else None}
+            for kind, values in runs.items()}
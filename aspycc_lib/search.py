@@ -0,0 +1,171 @@
+"""Bracketed one-dimensional target search for the AsPyCC design loops.
+    Replaces the point-by-point linear sweeps (solvent flowrate, packing height) with a
+    bracket-then-close search based on the Illinois variant of regula falsi, safeguarded
+    with bisection. Points where the simulator does not converge are treated as holes in
+    the function: the search steps around them instead of stopping.
+    solve_target_parallel is the k-section variant for a pool of simulators: k points are
+    evaluated at once per round and the bracket shrinks about k-fold per round.
+"""
+
+from dataclasses import dataclass, field
+
+
+@dataclass
+class SearchResult:
+    """Outcome of a target search. `calls` counts every simulator evaluation, holes included."""
+    x: float = None
+    value: float = None
+    converged: bool = False
+    calls: int = 0
+    holes: int = 0
+    rounds: int = 0 # batches of simultaneous evaluations (solve_target_parallel)
+    iterations: int = 0 # points stepped to (retries around a hole excluded), or rounds of a parallel search
+    history: list = field(default_factory=list) # (x, value) pairs, value is None for holes
+
+
+def solve_target(evaluate, start, stop, window, target=None, max_calls=40, xtol=None, hole_retries=3, guess=None):
+    """Find x between `start` and `stop` such that evaluate(x) falls inside `window`.
+
+    `evaluate` returns the function value, or None when the simulation did not converge.
+    `start` is evaluated first, so for a monotonic response the search returns immediately
+    when the starting point already meets the window. The function may be increasing or
+    decreasing; `start` and `stop` may be given in any order. A `guess` (e.g. a predicted
+    solution) is evaluated before `start`, and the interval is cut at it.
+    """
+    window = (min(window), max(window))
+    if target is None:
+        target = 0.5 * (window[0] + window[1])
+    if xtol is None:
+        xtol = 1e-6 * max(abs(start), abs(stop), 1.0)
+    result = SearchResult()
+
+    def in_window(value):
+        return window[0] <= value <= window[1]
+
+    def probe(x, a, b):
+        # Evaluate x; if it is a hole, try nearby points towards the interior of (a, b)
+        offsets = [0.0]
+        for i in range(1, hole_retries + 1):
+            offsets += [0.1 * i, -0.1 * i]
+        width = b - a
+        if result.calls < max_calls:
+            result.iterations += 1
+        for offset in offsets:
+            if result.calls >= max_calls:
+                break
+            xi = x + offset * width
+            if offset != 0.0 and not (min(a, b) < xi < max(a, b)):
+                continue
+            result.calls += 1
+            value = evaluate(xi)
+            result.history.append((xi, value))
+            if value is None:
+                result.holes += 1
+                continue
+            return xi, value
+        return None, None
+
+    def best_so_far():
+        # Closest converged point to the target, used when the search cannot finish
+        converged = [(x, v) for x, v in result.history if v is not None]
+        if not converged:
+            return None, None
+        return min(converged, key=lambda point: abs(point[1] - target))
+
+    def finish(x, value, converged):
+        result.x, result.value, result.converged = x, value, converged
+        return result
+
+    xg = fg = None
+    if guess is not None:
+        xg, fg = probe(guess, start, stop)
+        if xg is not None and in_window(fg):
+            return finish(xg, fg, True)
+
+    # Bracketing: evaluate both ends of the interval (the guess replaces the end on its side of the target)
+    xa, fa = probe(start, start, stop)
+    if xa is not None and in_window(fa):
+        return finish(xa, fa, True)
+    if xg is not None and xa is not None and (fa - target) * (fg - target) < 0:
+        xb, fb = xg, fg
+    else:
+        if xg is not None:
+            xa, fa = xg, fg
+        xb, fb = probe(stop, stop, start)
+        if xb is not None and in_window(fb):
+            return finish(xb, fb, True)
+    if xa is None or xb is None:
+        return finish(*best_so_far(), False)
+    ga, gb = fa - target, fb - target
+    if ga * gb > 0:
+        # Target is not inside the interval, return the end closest to it
+        return finish(*best_so_far(), False)
+
+    # Closing in: Illinois regula falsi with bisection safeguard
+    while result.calls < max_calls and abs(xb - xa) > xtol:
+        x = xb - gb * (xb - xa) / (gb - ga)
+        margin = 0.05 * abs(xb - xa)
+        if not (min(xa, xb) + margin <= x <= max(xa, xb) - margin):
+            x = 0.5 * (xa + xb)
+        xn, fn = probe(x, xa, xb)
+        if xn is None:
+            # Every probe around the candidate failed, try the midpoint once before giving up
+            xn, fn = probe(0.5 * (xa + xb), xa, xb)
+            if xn is None:
+                break
+        if in_window(fn):
+            return finish(xn, fn, True)
+        gn = fn - target
+        if gn * gb < 0:
+            xa, ga = xb, gb
+            xb, gb = xn, gn
+        else:
+            # Same side retained: halve the stale end (Illinois modification)
+            xb, gb = xn, gn
+            ga *= 0.5
+    return finish(*best_so_far(), False)
+
+
+def solve_target_parallel(evaluate_many, start, stop, window, k=4, target=None, max_rounds=8, xtol=None):
+    """k-section search: find x between `start` and `stop` such that the function falls inside `window`.
+
+    `evaluate_many(xs)` evaluates a list of points at once (e.g. on a pool of simulators) and
+    returns their values, None for holes. The first round evaluates k points spread over the
+    interval, ends included; every following round evaluates k interior points of the current
+    bracket, so the bracket shrinks (k + 1)-fold per round. The function must be monotonic.
+    """
+    window = (min(window), max(window))
+    if target is None:
+        target = 0.5 * (window[0] + window[1])
+    if xtol is None:
+        xtol = 1e-6 * max(abs(start), abs(stop), 1.0)
+    result = SearchResult()
+    a, b = start, stop
+    xs = [start + (stop - start) * i / (k - 1) for i in range(k)]
+    while True:
+        values = evaluate_many(xs)
+        result.rounds += 1
+        result.iterations += 1
+        result.calls += len(xs)
+        result.holes += sum(value is None for value in values)
+        result.history += list(zip(xs, values))
+
+        converged = sorted([(x, value) for x, value in result.history if value is not None and min(a, b) <= x <= max(a, b)],
+                           key=lambda point: point[0], reverse=start > stop)
+        inside = [point for point in converged if window[0] <= point[1] <= window[1]]
+        if inside:
+            result.x, result.value = min(inside, key=lambda point: abs(point[1] - target))
+            result.converged = True
+            return result
+
+        # New bracket: the consecutive converged points on either side of the target
+        crossing = [(p, q) for p, q in zip(converged, converged[1:]) if (p[1] - target) * (q[1] - target) < 0]
+        if not crossing or result.rounds >= max_rounds or abs(b - a) <= xtol:
+            break
+        (a, _), (b, _) = crossing[0]
+        xs = [a + (b - a) * i / (k + 1) for i in range(1, k + 1)]
+
+    converged = [(x, value) for x, value in result.history if value is not None]
+    if converged:
+        result.x, result.value = min(converged, key=lambda point: abs(point[1] - target))
+    return result
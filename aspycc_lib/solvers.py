@@ -0,0 +1,232 @@
+"""Simultaneous solvers for the coupled AsPyCC design specifications.
+    solve_feasibility_2d finds a point where two outputs (e.g. flooding and CCR) are both inside
+    their windows by adjusting two inputs together (e.g. diameter and solvent flowrate):
+    quasi-Newton (Broyden) steps from a finite-difference Jacobian, limited by a trust region
+    scaled to the starting point. It replaces fixed-step nudging of each input on its own.
+    solve_design_spec/DesignSpec solve one-variable design specifications (e.g. boil-up ratio
+    for the lean loading, packing height for the CCR) by secant steps with a bisection
+    fallback and a hard evaluation budget, starting from the previous case's solution.
+"""
+
+import numpy as np
+
+from dataclasses import dataclass, field
+
+
+@dataclass
+class SolverResult:
+    """Outcome of a solver. `trajectory` holds every evaluated (x, values) pair, values None for failures."""
+    x: tuple = None
+    values: tuple = None
+    converged: bool = False
+    calls: int = 0
+    iterations: int = 0
+    trajectory: list = field(default_factory=list)
+
+
+def solve_feasibility_2d(evaluate, x0, windows, steps, trust, bounds=None, max_calls=20):
+    """Adjust two inputs until both outputs of `evaluate` fall strictly inside their `windows`.
+
+    `evaluate(x)` returns a pair of outputs, or None if the simulation fails. `steps` are the
+    finite-difference steps of each input for the initial Jacobian and `trust` the maximum
+    change of each input per iteration, both in input units (scale them to the case, e.g. to
+    the feed rate). `bounds` is an optional ((low, high), (low, high)) pair, None for open ends.
+    Failed simulations are treated as holes: the solver steps around them rather than stopping.
+    """
+    windows = np.array(windows, dtype=float)
+    target = windows.mean(axis=1)
+    scale = 0.5 * (windows[:, 1] - windows[:, 0]) # residuals in units of half window
+    steps = np.array(steps, dtype=float)
+    trust = initial_trust = np.array(trust, dtype=float)
+    low = np.array([-np.inf if bound is None or bound[0] is None else bound[0] for bound in (bounds or [None, None])])
+    high = np.array([np.inf if bound is None or bound[1] is None else bound[1] for bound in (bounds or [None, None])])
+    result = SolverResult()
+
+    def feasible(values):
+        return all(window[0] < value < window[1] for value, window in zip(values, windows))
+
+    def probe(x):
+        result.calls += 1
+        values = evaluate(tuple(float(v) for v in x))
+        result.trajectory.append((tuple(float(v) for v in x), None if values is None else tuple(values)))
+        if values is None:
+            return None
+        return (np.array(values, dtype=float) - target) / scale
+
+    def finish(x, residual, converged):
+        result.x = tuple(float(v) for v in x)
+        result.values = None if residual is None else tuple(float(v) for v in residual * scale + target)
+        result.converged = converged
+        return result
+
+    def probe_around(x, shifts):
+        # Evaluate x moved by each shift in turn, skipping the failed simulations (holes)
+        for shift in shifts:
+            if result.calls >= max_calls:
+                break
+            xi = np.clip(x + shift, low, high)
+            if np.any(shift) and np.array_equal(xi, x):
+                continue
+            ri = probe(xi)
+            if ri is not None:
+                return xi, ri
+        return x, None
+
+    # Start point, or points around it if it fails
+    x = np.clip(np.array(x0, dtype=float), low, high)
+    x, r = probe_around(x, [np.zeros(2)] + [sign * fraction * steps for fraction in (0.5, 1.0) for sign in (1, -1)])
+    if r is None:
+        return finish(x, None, False)
+    if feasible(r * scale + target):
+        return finish(x, r, True)
+
+    # Initial Jacobian by forward differences (one extra evaluation per input). A failed
+    # difference point is retried in the opposite direction, then at half the step
+    jacobian = np.zeros((2, 2))
+    for i in range(2):
+        unit = np.eye(2)[i] * steps[i]
+        direction = 1.0 if x[i] + steps[i] <= high[i] else -1.0
+        xi, ri = probe_around(x, [direction * unit, -direction * unit, 0.5 * direction * unit, -0.5 * direction * unit])
+        if ri is None:
+            return finish(x, r, False)
+        jacobian[:, i] = (ri - r) / (xi[i] - x[i])
+        if feasible(ri * scale + target):
+            return finish(xi, ri, True)
+
+    while result.calls < max_calls:
+        result.iterations += 1
+        try:
+            dx = -np.linalg.solve(jacobian, r)
+        except np.linalg.LinAlgError:
+            dx = -np.linalg.lstsq(jacobian, r, rcond=None)[0]
+
+        # Trust region: shrink the whole step so that no input moves more than its trust radius
+        ratio = np.max(np.abs(dx) / trust)
+        if ratio > 1:
+            dx = dx / ratio
+        x_new = np.clip(x + dx, low, high)
+        dx = x_new - x
+        if not np.any(dx):
+            break
+        r_new = probe(x_new)
+        if r_new is None:
+            # Failed simulation: try a shorter step
+            trust = 0.5 * trust
+            continue
+        if feasible(r_new * scale + target):
+            return finish(x_new, r_new, True)
+
+        # Broyden rank-one update of the Jacobian
+        jacobian += np.outer((r_new - r) - jacobian @ dx, dx) / (dx @ dx)
+        if np.linalg.norm(r_new) < np.linalg.norm(r):
+            x, r = x_new, r_new
+            trust = np.minimum(1.5 * trust, 4 * initial_trust)
+        else:
+            trust = 0.5 * trust
+
+    return finish(x, r, False)
+
+
+def solve_design_spec(evaluate, target, tolerance, bounds, x0, step, slope=None, max_calls=12):
+    """Adjust one input until `evaluate(x)` is within `tolerance` of `target` (a design specification).
+
+    Secant steps, with bisection whenever a secant step leaves the bracket found so far, and
+    at most `max_calls` evaluations. `evaluate(x)` returns None if the simulation fails; the
+    next point is then taken halfway back to the last converged one. The second point is a
+    Newton step with `slope` (e.g. from the previous case) if given, else `x0 + step`.
+    Without convergence, the point closest to the target is returned.
+    """
+    low, high = bounds
+    result = SolverResult()
+    points = [] # last two converged (x, residual)
+    below = above = None # latest points with residual below / above zero
+    best = None
+
+    def probe(x):
+        result.calls += 1
+        value = evaluate(float(x))
+        result.trajectory.append((float(x), value))
+        return None if value is None else value - target
+
+    x = min(max(x0, low), high)
+    while True:
+        r = probe(x)
+        if r is not None:
+            if best is None or abs(r) < abs(best[1]):
+                best = (x, r)
+            if abs(r) <= tolerance:
+                break
+            if r < 0:
+                below = (x, r)
+            else:
+                above = (x, r)
+            points = (points + [(x, r)])[-2:]
+        if result.calls >= max_calls:
+            break
+        result.iterations += 1
+
+        # Next point: secant through the last two converged points, first step, or back off from a failure
+        if r is None:
+            if not points:
+                break
+            x_new = 0.5 * (x + points[-1][0])
+        elif len(points) == 2 and points[1][1] != points[0][1]:
+            (xa, ra), (xb, rb) = points
+            x_new = xb - rb * (xb - xa) / (rb - ra)
+        elif slope:
+            x_new = x - r / slope
+        else:
+            x_new = x + step
+        if below is not None and above is not None:
+            lower, upper = sorted((below[0], above[0]))
+            if not lower < x_new < upper:
+                x_new = 0.5 * (lower + upper)
+        x_new = min(max(x_new, low), high)
+        if x_new == x:
+            break # pinned at a bound
+        x = x_new
+
+    if best is None:
+        result.x = float(x)
+        return result
+    result.x, result.values, result.converged = float(best[0]), best[1] + target, abs(best[1]) <= tolerance
+    return result
+
+
+class DesignSpec:
+    """A design specification solved once per case: `variable` is adjusted until `output(nodes)`
+    reaches the target (see solve_design_spec). The solution and local slope of the previous
+    case are kept and used as the starting point of the next one.
+    """
+
+    def __init__(self, variable, output, tolerance, bounds, initial_guess, step, max_calls=12):
+        self.variable = variable
+        self.output = output
+        self.tolerance = tolerance
+        self.bounds = bounds
+        self.initial_guess = initial_guess
+        self.step = step
+        self.max_calls = max_calls
+        self.previous = None
+        self.slope = None
+
+    def solve(self, nodes, target, guess=None):
+        """Solve for `target` on the document of `nodes`, starting from `guess`, the previous solution
+        or the initial guess (in that order). The document is left at the solution."""
+
+        def evaluate(x):
+            nodes.write(self.variable, x)
+            return self.output(nodes)
+
+        x0 = next(x for x in (guess, self.previous, self.initial_guess) if x is not None)
+        result = solve_design_spec(evaluate, target, self.tolerance, self.bounds, x0, self.step,
+                                   slope=self.slope, max_calls=self.max_calls)
+        if result.converged:
+            self.previous = result.x
+            converged = [(x, value) for x, value in result.trajectory if value is not None]
+            if len(converged) >= 2 and converged[-1][0] != converged[-2][0]:
+                (xa, va), (xb, vb) = converged[-2:]
+                self.slope = (vb - va) / (xb - xa) or self.slope
+        if result.trajectory and result.trajectory[-1][0] != result.x:
+            evaluate(result.x) # leave the document at the returned point
+        return result
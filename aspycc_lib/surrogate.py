@@ -0,0 +1,183 @@
+"""Surrogate models of the flowsheet stages, trained on logged simulator evaluations.
+    For every stage of nodes.STAGES, a Gaussian process (squared-exponential kernel on
+    standardized inputs, length scale chosen by marginal likelihood) predicts derived outputs
+    of the converged runs (e.g. CCR and flooding for the absorber, apparent lean loading for
+    the stripper) with their uncertainty, and a kernel-weighted estimate gives the probability
+    that a run converges. Evaluations are added as they arrive (NodeRegistry feeds every
+    simulator run, load() reads new rows of a ResultCache) and the models are refitted
+    incrementally. The pipeline uses the predictions to narrow the search brackets, to start
+    the design specifications near their solution and to skip cases that cannot meet the targets.
+"""
+
+import json
+
+import numpy as np
+
+# Factors tried on each length scale when a model is refitted (inf: the input is ignored),
+# and the smallest length scale allowed (in standard deviations of the input)
+LENGTH_SCALE_FACTORS = (0.25, 0.5, 2.0, 4.0, np.inf)
+MINIMUM_LENGTH_SCALE = 0.05
+
+
+class GaussianProcess:
+    """Gaussian-process regression of several outputs sharing the same inputs and kernel.
+
+    Positive inputs are log-transformed (so that ratios such as solvent to flue gas flowrate
+    are differences), then standardized. Each input has its own length scale (automatic
+    relevance determination), tuned by coordinate search on the log marginal likelihood of
+    the last `tuning_points` points.
+    """
+
+    def __init__(self, noise=1e-4, tuning_points=300, tuning_passes=2):
+        self.noise = noise
+        self.tuning_points = tuning_points
+        self.tuning_passes = tuning_passes
+        self.length_scales = None
+
+    def _transform(self, X):
+        X = np.asarray(X, dtype=float).copy()
+        X[:, self._log] = np.log(X[:, self._log])
+        return (X - self._x_mean) / self._x_scale / self.length_scales
+
+    @staticmethod
+    def _kernel(A, B):
+        distances = np.sum(A ** 2, axis=1)[:, None] + np.sum(B ** 2, axis=1)[None, :] - 2 * A @ B.T
+        return np.exp(-0.5 * np.maximum(distances, 0.0))
+
+    def _factorize(self, X, Z):
+        # Cholesky factor, weights and log marginal likelihood (None if the kernel matrix is singular)
+        K = self._kernel(X, X) + self.noise * np.eye(len(X))
+        try:
+            L = np.linalg.cholesky(K)
+        except np.linalg.LinAlgError:
+            return None
+        alpha = np.linalg.solve(L.T, np.linalg.solve(L, Z))
+        return L, alpha, -0.5 * np.sum(Z * alpha) - Z.shape[1] * np.sum(np.log(np.diag(L)))
+
+    def fit(self, X, Y):
+        X, Y = np.asarray(X, dtype=float), np.asarray(Y, dtype=float)
+        self._log = np.all(X > 0, axis=0)
+        X = X.copy()
+        X[:, self._log] = np.log(X[:, self._log])
+        self._x_mean, self._x_scale = X.mean(axis=0), X.std(axis=0)
+        self._x_scale[self._x_scale == 0] = 1.0
+        self._y_mean, self._y_scale = Y.mean(axis=0), Y.std(axis=0)
+        self._y_scale[self._y_scale == 0] = 1.0
+        X = (X - self._x_mean) / self._x_scale
+        Z = (Y - self._y_mean) / self._y_scale
+
+        # Length scales: coordinate search on the most recent points, starting from the previous fit
+        scales = np.ones(X.shape[1]) if self.length_scales is None else self.length_scales.copy()
+        scales[~np.isfinite(scales)] = 1.0
+        tuning_X, tuning_Z = X[-self.tuning_points:], Z[-self.tuning_points:]
+        best = self._factorize(tuning_X / scales, tuning_Z)
+        best_likelihood = -np.inf if best is None else best[2]
+        for _ in range(self.tuning_passes):
+            for i in range(X.shape[1]):
+                current = scales[i]
+                for factor in LENGTH_SCALE_FACTORS:
+                    scales[i] = max(current * factor, MINIMUM_LENGTH_SCALE)
+                    fit = self._factorize(tuning_X / scales, tuning_Z)
+                    if fit is not None and fit[2] > best_likelihood:
+                        best_likelihood, current = fit[2], scales[i]
+                scales[i] = current
+        self.length_scales = scales
+        fit = self._factorize(X / scales, Z)
+        if fit is None:
+            raise np.linalg.LinAlgError('Kernel matrix is not positive definite')
+        self._X, (self._L, self._alpha, _) = X / scales, fit
+        return self
+
+    def predict(self, X):
+        """Mean and standard deviation of every output, each an (n points, n outputs) array."""
+        k = self._kernel(self._transform(X), self._X)
+        mean = k @ self._alpha
+        v = np.linalg.solve(self._L, k.T)
+        variance = np.maximum(1.0 - np.sum(v ** 2, axis=0), 0.0)
+        return mean * self._y_scale + self._y_mean, np.sqrt(variance)[:, None] * self._y_scale
+
+    def similarity(self, X, reference):
+        """Kernel between the points X and `reference` (both in input units), (n X, n reference)."""
+        return self._kernel(self._transform(X), self._transform(reference))
+
+
+class StageSurrogate:
+    """Surrogate of one stage: `derived` maps output names to functions of the stage outputs
+    (a {variable: value} dict of a converged run, see NodeRegistry.evaluate)."""
+
+    def __init__(self, derived, max_points=1000, min_points=30, refit_every=10):
+        self.derived = derived
+        self.max_points = max_points
+        self.min_points = min_points
+        self.refit_every = refit_every
+        self.inputs, self.values, self.converged = [], [], []
+        self._seen = set() # input vectors already added (runs also come back through the cache)
+        self._model = None
+        self._new_points = 0
+
+    def add(self, inputs, outputs):
+        inputs = [float(value) for value in inputs]
+        if tuple(inputs) in self._seen:
+            return
+        self._seen.add(tuple(inputs))
+        converged = outputs.get('per_error') == 0
+        self.inputs.append(inputs)
+        self.values.append([float(function(outputs)) for function in self.derived.values()] if converged else None)
+        self.converged.append(converged)
+        if len(self.inputs) > self.max_points:
+            # Keep the most recent evaluations
+            self._seen.discard(tuple(self.inputs[0]))
+            del self.inputs[0], self.values[0], self.converged[0]
+        self._new_points += 1
+
+    @property
+    def ready(self):
+        return sum(self.converged) >= self.min_points
+
+    def _refit(self):
+        if self._model is not None and self._new_points < self.refit_every:
+            return
+        X = np.array([x for x, converged in zip(self.inputs, self.converged) if converged])
+        Y = np.array([y for y in self.values if y is not None])
+        self._model = (self._model or GaussianProcess()).fit(X, Y)
+        self._all_inputs = np.array(self.inputs)
+        self._all_converged = np.array(self.converged, dtype=float)
+        self._new_points = 0
+
+    def predict(self, X):
+        """{output: (mean, std)} for every derived output and 'convergence_probability' at the points X."""
+        self._refit()
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        mean, std = self._model.predict(X)
+        predictions = {name: (mean[:, i], std[:, i]) for i, name in enumerate(self.derived)}
+
+        # Kernel-weighted fraction of converged runs around each point (with a uniform prior)
+        weights = self._model.similarity(X, self._all_inputs)
+        predictions['convergence_probability'] = (weights @ self._all_converged + 1) / (weights.sum(axis=1) + 2)
+        return predictions
+
+
+class Surrogate:
+    """Surrogates of several stages. `derived` is {stage: {output: function of the stage outputs}}."""
+
+    def __init__(self, derived, **options):
+        self.stages = {stage: StageSurrogate(outputs, **options) for stage, outputs in derived.items()}
+        self._loaded = {} # stage -> last cache row read
+
+    def add(self, stage, inputs, outputs):
+        if stage in self.stages:
+            self.stages[stage].add(inputs, outputs)
+
+    def ready(self, stage):
+        return stage in self.stages and self.stages[stage].ready
+
+    def predict(self, stage, X):
+        return self.stages[stage].predict(X)
+
+    def load(self, cache):
+        """Add the evaluations stored in a ResultCache since the last call (e.g. by other workers)."""
+        for stage in self.stages:
+            rows = cache.rows(stage, after=self._loaded.get(stage, 0))
+            for row_id, inputs, outputs in rows:
+                self.add(stage, json.loads(inputs), json.loads(outputs))
+                self._loaded[stage] = row_id
@@ -0,0 +1,25 @@
+"""Campaign runner on the pure-Python stand-in with simulated latency and hung runs."""
+
+from aspycc_lib.backends import FakeBackend
+from aspycc_lib.campaign import run_campaign
+
+CASES = [(index, {'flowrate': 200.0 + 50 * index, 'N2': 0.7, 'O2': 0.05, 'CO2': 0.15, 'H2O': 0.1, 'H2': 0.0, 'CO': 0.0,
+                  'CH4': 0.0})
+         for index in range(3)]
+
+
+def test_every_case_is_designed():
+    results = list(run_campaign(CASES, FakeBackend(options={'latency': 0.01}), workers=2))
+    assert sorted(result['index'] for result in results) == [0, 1, 2]
+    assert all(result['status'] == 'ok' for result in results)
+    assert all(result['attempts'] == 1 and result['elapsed'] > 0 for result in results)
+
+
+def test_hung_worker_is_restarted():
+    # The 40th run of a document never finishes: the second case of the first worker hangs
+    backend = FakeBackend(options={'latency': 0.01, 'hang_every': 40})
+    results = {result['index']: result for result in run_campaign(CASES, backend, workers=1, case_timeout=2, max_attempts=1)}
+    assert results[0]['status'] == 'ok'
+    assert results[1]['status'] == 'failed' and results[1]['error'] == 'timeout'
+    # The next case runs on a new worker
+    assert results[2]['status'] == 'ok' and results[2]['worker'] != results[1]['worker']
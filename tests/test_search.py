@@ -0,0 +1,75 @@
+"""Bracketed CCR search on the pure-Python stand-in for Aspen Plus (see fake.py), with
+    solvent flowrate intervals where the simulation does not converge.
+"""
+
+import pytest
+
+from aspycc_lib.absorber import CCR_TARGET_WINDOW, search_solvent_flowrate
+from aspycc_lib.fake import FakeAspen
+from aspycc_lib.nodes import NodeRegistry
+from aspycc_lib.pipeline import design_case, design_status, set_flue_gas, set_lean_solvent
+from aspycc_lib.search import solve_target
+
+CASE = {'flowrate': 200.0, 'N2': 0.625, 'O2': 0.06, 'CO2': 0.195, 'H2O': 0.12, 'H2': 0.0, 'CO': 0.0, 'CH4': 0.0}
+
+
+def absorber_nodes(holes=()):
+    Aspen = FakeAspen(holes=holes)
+    Aspen.InitFromArchive2('fake.bkp')
+    nodes = NodeRegistry(Aspen)
+    set_flue_gas(nodes, CASE)
+    set_lean_solvent(nodes, 0.12)
+    return nodes
+
+
+def in_hole(x, holes):
+    return any(low <= x <= high for low, high in holes)
+
+
+def test_solve_target_steps_around_holes():
+    calls = []
+
+    def evaluate(x):
+        calls.append(x)
+        return None if 4 <= x <= 6 else x
+
+    result = solve_target(evaluate, 0, 10, (4.9, 5.2))
+    assert not result.converged # the whole window lies in the hole
+    assert result.calls == len(calls) == len(result.history)
+    assert result.holes == sum(4 <= x <= 6 for x in calls) > 0
+    assert result.calls <= 40
+
+
+@pytest.mark.parametrize('holes', [(), [(430, 470)]])
+def test_solvent_search_converges_with_holes(holes):
+    nodes = absorber_nodes(holes)
+    result = search_solvent_flowrate(nodes, 200, 700)
+    assert result.converged
+    assert CCR_TARGET_WINDOW[0] <= result.value <= CCR_TARGET_WINDOW[1]
+    assert not in_hole(result.x, holes)
+    assert result.calls == len(result.history) <= 8
+    # Failed runs are counted and skipped, converged ones are outside the holes
+    assert result.holes == sum(value is None for _, value in result.history)
+    assert result.holes == len(holes)
+    assert all(in_hole(x, holes) == (value is None) for x, value in result.history)
+
+
+def test_failed_run_reports_its_status_only():
+    nodes = absorber_nodes([(430, 470)])
+    nodes.write('solvent_flowrate', 450.0)
+    assert nodes.evaluate('absorber') == {'per_error': 1}
+    nodes.write('solvent_flowrate', 480.0)
+    outputs = nodes.evaluate('absorber')
+    assert outputs['per_error'] == 0 and outputs['clean_gas_CO2_out'] is not None
+
+
+def test_design_case_with_holes():
+    Aspen = FakeAspen(holes=[(190, 210)])
+    Aspen.InitFromArchive2('fake.bkp')
+    design = design_case(Aspen, dict(CASE, N2=0.7, O2=0.05, CO2=0.15, H2O=0.1), verbose=False)
+    assert design_status(design) == 'ok'
+    assert CCR_TARGET_WINDOW[0] <= design['ccr'] <= CCR_TARGET_WINDOW[1]
+    assert not in_hole(design['solvent_flowrate'], [(190, 210)])
+    assert design['simulator_runs'] <= 40
+    assert 0 < design['solvent_search_calls'] <= 10 and 0 < design['height_search_calls'] <= 10
+    assert design['solvent_search_calls'] + design['height_search_calls'] + design['sizing_calls'] < design['simulator_runs']
@@ -0,0 +1,124 @@
+"""Absorber sizing (2-D feasibility solver) and design specifications on the pure-Python
+    stand-in for Aspen Plus (see fake.py).
+"""
+
+import numpy as np
+import pytest
+
+from aspycc_lib.fake import FakeAspen
+from aspycc_lib.pipeline import DesignSpecs, design_case
+from aspycc_lib.solvers import solve_design_spec, solve_feasibility_2d
+
+CASE = {'flowrate': 200.0, 'N2': 0.625, 'O2': 0.06, 'CO2': 0.195, 'H2O': 0.12, 'H2': 0.0, 'CO': 0.0, 'CH4': 0.0}
+
+
+def design(flowrate, holes=()):
+    Aspen = FakeAspen(holes=holes)
+    Aspen.InitFromArchive2('fake.bkp')
+    return design_case(Aspen, dict(CASE, flowrate=flowrate), verbose=False)
+
+
+def test_feasibility_steps_around_failed_difference_points():
+    # Linear response with holes on both forward-difference points
+    def evaluate(x):
+        if x[0] == 3.0 or x[1] == 4.0:
+            return None
+        return 10 * x[0], 5 * x[1] + x[0]
+
+    result = solve_feasibility_2d(evaluate, (1.0, 2.0), ((24, 26), (30, 32)), steps=(2.0, 2.0), trust=(3.0, 3.0))
+    assert result.converged
+    assert result.calls == len(result.trajectory) < 10
+    assert [values for _, values in result.trajectory].count(None) == 2
+    assert 24 < result.values[0] < 26 and 30 < result.values[1] < 32
+
+
+@pytest.mark.parametrize('flowrate', [200.0, 600.0, 1000.0])
+def test_sizing_takes_single_digit_calls(flowrate):
+    result = design(flowrate)
+    assert result['sizing_converged']
+    assert result['sizing_calls'] < 10
+    trajectory = result['sizing_trajectory']
+    assert len(trajectory) == result['sizing_calls']
+    assert trajectory[-1] == pytest.approx([result['diameter'], result['solvent_flowrate']])
+    assert 69.99 < result['flooding'] < 79.99
+
+
+@pytest.mark.parametrize('flowrate', [200.0, 600.0])
+def test_sizing_with_hole_at_difference_point(flowrate):
+    diameter, solvent_flowrate = design(flowrate)['sizing_trajectory'][0]
+    step = 0.02 * solvent_flowrate # finite-difference step of the solvent flowrate (see design_absorber)
+    result = design(flowrate, holes=[(solvent_flowrate + 0.99 * step, solvent_flowrate + 1.01 * step)])
+    assert result['sizing_converged']
+    assert result['sizing_calls'] < 10
+    # The failed difference point is retried in the opposite direction
+    np.testing.assert_allclose(result['sizing_trajectory'][:4], [[diameter, solvent_flowrate], [1.05 * diameter, solvent_flowrate],
+                                                                [diameter, solvent_flowrate + step], [diameter, solvent_flowrate - step]])
+
+
+def brackets(trajectory, target):
+    # (x, lower, upper) for every point evaluated once the target was bracketed, bracket taken from the points before it
+    below = above = None
+    for x, value in trajectory:
+        if below is not None and above is not None:
+            yield x, *sorted((below, above))
+        if value is not None:
+            if value < target:
+                below = x
+            else:
+                above = x
+
+
+def test_design_spec_bisects_when_the_secant_leaves_the_bracket():
+    target = float(np.exp(4.0))
+    result = solve_design_spec(lambda x: float(np.exp(4 * x)), target, 1e-6 * target, (0, 10), 0.0, 3.0, max_calls=20)
+    assert result.converged and result.x == pytest.approx(1.0)
+    points = list(brackets(result.trajectory, target))
+    assert all(lower < x < upper for x, lower, upper in points)
+    assert any(x == pytest.approx(0.5 * (lower + upper)) for x, lower, upper in points) # bisection step
+
+
+def test_design_spec_call_budget():
+    target = float(np.exp(4.0))
+    result = solve_design_spec(lambda x: float(np.exp(4 * x)), target, 1e-9, (0, 10), 0.0, 3.0, max_calls=5)
+    assert not result.converged
+    assert result.calls == len(result.trajectory) == 5
+    # The point closest to the target is returned
+    assert result.x == min(result.trajectory, key=lambda point: abs(point[1] - target))[0]
+
+
+def test_design_spec_pinned_at_bound():
+    result = solve_design_spec(lambda x: x, 5.0, 1e-3, (0, 1), 0.2, 0.3)
+    assert not result.converged
+    assert result.x == 1.0 and result.calls == 3
+
+
+def test_design_spec_steps_back_from_failed_runs():
+    result = solve_design_spec(lambda x: None if 1.2 < x < 1.8 else x, 2.0, 1e-3, (0, 10), 1.0, 0.5)
+    assert result.converged and result.x == pytest.approx(2.0)
+    assert [value for _, value in result.trajectory].count(None) == 2
+
+
+def test_boilup_ratio_reuses_previous_case_through_design_specs():
+    specs = DesignSpecs()
+    solves = []
+    solve = specs.boilup_ratio.solve
+
+    def spy(nodes, target, guess=None):
+        solves.append((specs.boilup_ratio.previous, guess, solve(nodes, target, guess=guess)))
+        return solves[-1][2]
+
+    specs.boilup_ratio.solve = spy
+    designs = []
+    for flowrate in (200.0, 220.0):
+        Aspen = FakeAspen()
+        Aspen.InitFromArchive2('fake.bkp')
+        designs.append(design_case(Aspen, dict(CASE, flowrate=flowrate), verbose=False, specs=specs))
+    (first_previous, _, first), (second_previous, guess, second) = solves
+    assert first_previous is None and first.trajectory[0][0] == specs.boilup_ratio.initial_guess
+    assert first.converged and first.calls <= specs.boilup_ratio.max_calls
+    # The second case starts from the solution of the first one
+    assert guess is None and second_previous == designs[0]['boilup_ratio']
+    assert second.trajectory[0][0] == second_previous
+    assert second.converged and second.calls < first.calls
+    # New DesignSpecs start from the initial guess again
+    assert DesignSpecs().boilup_ratio.previous is None